@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+
+from board import Board, BoardPiece
+
+ONGOING = 0
+YELLOW_WIN = BoardPiece.YELLOW.value
+RED_WIN = BoardPiece.RED.value
+DRAW = 3
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def stackBoards(boards: list[Board]) -> np.ndarray:
+    stacked = np.zeros((len(boards), boards[0].getRows(), boards[0].getCols()), dtype=np.int8)
+    for i, board in enumerate(boards):
+        stacked[i] = [[piece.value for piece in row] for row in board.getBoard()]
+    return stacked
+
+
+def _windowCounts(mask: np.ndarray, connectN: int, dr: int, dc: int) -> np.ndarray:
+    # number of set cells in every connectN-long window along (dr, dc), by summing shifted views
+    _, rows, cols = mask.shape
+    height = rows - dr * (connectN - 1)
+    width = cols - abs(dc) * (connectN - 1)
+    if height <= 0 or width <= 0:
+        return np.zeros((mask.shape[0], 0, 0), dtype=np.int8)
+    colStart = 0 if dc >= 0 else cols - width
+    counts = np.zeros((mask.shape[0], height, width), dtype=np.int8)
+    for i in range(connectN):
+        r = dr * i
+        c = colStart + dc * i
+        counts += mask[:, r:r + height, c:c + width]
+    return counts
+
+
+def evaluateBoards(boards: np.ndarray, connectN: int = 4) -> dict[str, np.ndarray]:
+    # boards: (n, rows, cols) array of BoardPiece values
+    empty = boards == BoardPiece.EMPTY.value
+    yellow = boards == BoardPiece.YELLOW.value
+    red = boards == BoardPiece.RED.value
+    n, _, cols = boards.shape
+
+    yellowWins = np.zeros(n, dtype=bool)
+    redWins = np.zeros(n, dtype=bool)
+    yellowThrees = np.zeros(n, dtype=np.int32)
+    redThrees = np.zeros(n, dtype=np.int32)
+    for dr, dc in DIRECTIONS:
+        emptyCounts = _windowCounts(empty, connectN, dr, dc)
+        yellowCounts = _windowCounts(yellow, connectN, dr, dc)
+        redCounts = _windowCounts(red, connectN, dr, dc)
+        yellowWins |= (yellowCounts == connectN).any(axis=(1, 2))
+        redWins |= (redCounts == connectN).any(axis=(1, 2))
+        # an open three is a window one piece short of connectN with the last cell empty
+        yellowThrees += ((yellowCounts == connectN - 1) & (emptyCounts == 1)).sum(axis=(1, 2))
+        redThrees += ((redCounts == connectN - 1) & (emptyCounts == 1)).sum(axis=(1, 2))
+
+    status = np.full(n, ONGOING, dtype=np.int8)
+    status[~empty.any(axis=(1, 2))] = DRAW
+    status[yellowWins] = YELLOW_WIN
+    status[redWins] = RED_WIN
+
+    center = [cols // 2] if cols % 2 else [cols // 2 - 1, cols // 2]
+    return {
+        "status": status,
+        "yellowOpenThrees": yellowThrees,
+        "redOpenThrees": redThrees,
+        "yellowCenter": yellow[:, :, center].sum(axis=(1, 2)),
+        "redCenter": red[:, :, center].sum(axis=(1, 2)),
+    }
+
+
+def randomBoards(n: int, rows: int = 6, cols: int = 7, seed: int = 0) -> np.ndarray:
+    # random column heights filled bottom-up with random colours; not necessarily reachable positions
+    rng = np.random.default_rng(seed)
+    heights = rng.integers(0, rows + 1, size=(n, 1, cols))
+    filled = np.arange(rows)[::-1].reshape(1, rows, 1) < heights
+    colours = rng.integers(BoardPiece.YELLOW.value, BoardPiece.RED.value + 1, size=(n, rows, cols))
+    return np.where(filled, colours, BoardPiece.EMPTY.value).astype(np.int8)
+
+
+if __name__ == "__main__":
+    boards = randomBoards(1_000_000)
+    start = time.perf_counter()
+    result = evaluateBoards(boards)
+    elapsed = time.perf_counter() - start
+    counts = np.bincount(result["status"], minlength=4)
+    print(f"batch: {len(boards)} boards in {elapsed:.2f}s ({len(boards) / elapsed:,.0f} boards/s)")
+    print(f"ongoing={counts[ONGOING]} yellow={counts[YELLOW_WIN]} red={counts[RED_WIN]} draw={counts[DRAW]}")
+
+    sample = boards[:10_000]
+    pieces = {piece.value: piece for piece in BoardPiece}
+    start = time.perf_counter()
+    for grid in sample:
+        board = Board(6, 7)
+        board.grid = [[pieces[value] for value in row] for row in grid.tolist()]
+        for row in range(6):
+            for col in range(7):
+                if board.grid[row][col] != BoardPiece.EMPTY:
+                    board.checkWin(4, row, col, board.grid[row][col])
+    elapsed = time.perf_counter() - start
+    print(f"checkWin loop: {len(sample) / elapsed:,.0f} boards/s")
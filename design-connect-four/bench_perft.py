@@ -0,0 +1,65 @@
+import copy
+import sys
+import time
+
+from board import Board, BoardPiece
+from engine import opponent
+
+CONNECT_N = 4
+
+
+def copyBoard(board: Board) -> Board:
+    # only the grid rows, column heights and move list change as pieces are placed;
+    # the Zobrist table is shared and the hashes are plain ints
+    child = copy.copy(board)
+    child.grid = [row[:] for row in board.grid]
+    child.heights = board.heights[:]
+    child.moves = board.moves[:]
+    return child
+
+
+def perftCopy(board: Board, piece: BoardPiece, depth: int) -> int:
+    # forward-only baseline: every child is a copy of its parent's mutable state
+    if depth == 0:
+        return 1
+    nodes = 0
+    for col in range(board.getCols()):
+        if not board.isValidMove(col):
+            continue
+        child = copyBoard(board)
+        row = child.placePiece(col, piece)
+        if child.checkWin(CONNECT_N, row, col, piece):
+            nodes += 1
+        else:
+            nodes += perftCopy(child, opponent(piece), depth - 1)
+    return nodes
+
+
+def perftUndo(board: Board, piece: BoardPiece, depth: int) -> int:
+    if depth == 0:
+        return 1
+    nodes = 0
+    for col in range(board.getCols()):
+        if not board.isValidMove(col):
+            continue
+        row = board.placePiece(col, piece)
+        if board.checkWin(CONNECT_N, row, col, piece):
+            nodes += 1
+        else:
+            nodes += perftUndo(board, opponent(piece), depth - 1)
+        board.undoMove()
+    return nodes
+
+
+if __name__ == "__main__":
+    maxDepth = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for depth in range(1, maxDepth + 1):
+        timings = []
+        for perft in (perftCopy, perftUndo):
+            start = time.perf_counter()
+            nodes = perft(Board(6, 7), BoardPiece.RED, depth)
+            timings.append((nodes, time.perf_counter() - start))
+        (copyNodes, copyTime), (undoNodes, undoTime) = timings
+        assert copyNodes == undoNodes
+        print(f"depth {depth}: {undoNodes} nodes, copy {copyTime:.3f}s, undo {undoTime:.3f}s, "
+              f"speedup {copyTime / undoTime:.1f}x")
@@ -0,0 +1,66 @@
+import os
+import time
+
+from board import Board, BoardPiece
+from engine import Engine, ParallelSearch, opponent
+
+# opening sequences (column per ply) on a 6x7 board, connect 4
+POSITIONS = [
+    "",
+    "3",
+    "33",
+    "3324",
+    "332415",
+    "2345",
+    "0123456",
+    "334422",
+]
+DEPTH = 7
+
+
+def loadPosition(moves: str) -> tuple[Board, BoardPiece]:
+    board = Board(6, 7)
+    piece = BoardPiece.RED
+    for move in moves:
+        board.placePiece(int(move), piece)
+        piece = opponent(piece)
+    return board, piece
+
+
+def serialSearch(board: Board, piece: BoardPiece) -> tuple[int, int]:
+    engine = Engine(4, DEPTH)
+    col, _ = engine.search(board, piece)
+    return col, engine.nodes
+
+
+def runSuite(search) -> tuple[float, list[int], int]:
+    # `search` returns the chosen column and the nodes it visited
+    start = time.perf_counter()
+    moves = []
+    totalNodes = 0
+    for position in POSITIONS:
+        board, piece = loadPosition(position)
+        col, nodes = search(board, piece)
+        moves.append(col)
+        totalNodes += nodes
+    return time.perf_counter() - start, moves, totalNodes
+
+
+def parallelSearch(search: ParallelSearch):
+    def run(board: Board, piece: BoardPiece) -> tuple[int, int]:
+        col, _ = search.search(board, piece)
+        return col, search.nodes
+    return run
+
+
+if __name__ == "__main__":
+    baseline, expected, baselineNodes = runSuite(serialSearch)
+    print(f"serial: {baseline:.2f}s nodes={baselineNodes:,} moves={expected}")
+
+    workerCounts = sorted({1, 2, 4, 8, os.cpu_count()})
+    for workers in workerCounts:
+        with ParallelSearch(4, DEPTH, workers=workers, deterministic=True) as search:
+            elapsed, moves, nodes = runSuite(parallelSearch(search))
+        match = "ok" if moves == expected else "MISMATCH"
+        print(f"workers={workers}: {elapsed:.2f}s nodes={nodes:,} ({nodes / baselineNodes:.2f}x serial) "
+              f"speedup={baseline / elapsed:.2f}x moves {match}")
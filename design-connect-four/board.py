@@ -1,37 +1,102 @@
 import enum
+import functools
+import random
+
+ZOBRIST_SEED = 0xC4
 
 class BoardPiece(enum.Enum):
     EMPTY = 0
     YELLOW = 1
     RED = 2
+
+
+@functools.lru_cache(maxsize=None)
+def zobristTable(rows: int, cols: int) -> list[list[list[int]]]:
+    rng = random.Random(ZOBRIST_SEED)
+    return [[[rng.getrandbits(64) for _ in BoardPiece] for _ in range(cols)] for _ in range(rows)]
+
     
 class Board:
     def __init__(self, rows, cols):
         self.rows = rows
         self.cols = cols
         self.grid = []
+        self.zobrist = zobristTable(rows, cols)
         self.init()
     
     def init(self):
         self.grid = [[BoardPiece.EMPTY] * self.cols for _ in range(self.rows)]
+        self.heights = [0] * self.cols
+        self.moves = []
+        # hashes of the position and of its mirror image about the centre column
+        self.hash = 0
+        self.mirrorHash = 0
+
+    def reset(self):
+        # clears only the cells that were played instead of reallocating the grid
+        for row, col, _ in self.moves:
+            self.grid[row][col] = BoardPiece.EMPTY
+            self.heights[col] = 0
+        self.moves.clear()
+        self.hash = 0
+        self.mirrorHash = 0
+
+    def getPositionKey(self) -> int:
+        return min(self.hash, self.mirrorHash)
+
+    def isMirrored(self) -> bool:
+        return self.mirrorHash < self.hash
+
+    def _toggleHash(self, row: int, col: int, piece: BoardPiece):
+        self.hash ^= self.zobrist[row][col][piece.value]
+        self.mirrorHash ^= self.zobrist[row][self.cols - 1 - col][piece.value]
     
     def getCols(self) -> int:
         return self.cols
 
+    def getRows(self) -> int:
+        return self.rows
+
     def getBoard(self) -> list[list[BoardPiece]]:
         return self.grid
+
+    def getPiece(self, row: int, col: int) -> BoardPiece:
+        return self.grid[row][col]
     
     def placePiece(self, col: int, piece: BoardPiece) -> int:
         if piece == BoardPiece.EMPTY:
             raise ValueError("Invalid Piece")
-        if 0 <= col < self.cols:
-            for row in range(self.rows-1, -1, -1):
-                if self.grid[row][col] == BoardPiece.EMPTY:
-                    self.grid[row][col] = piece
-                    return row
-        else:
+        if not 0 <= col < self.cols:
             raise ValueError("Out of bounds")
-        return 0
+        if self.heights[col] == self.rows:
+            return 0
+        row = self.rows - 1 - self.heights[col]
+        self.grid[row][col] = piece
+        self.heights[col] += 1
+        self._toggleHash(row, col, piece)
+        self.moves.append((row, col, piece))
+        return row
+
+    def undoMove(self) -> tuple[int, int]:
+        if not self.moves:
+            raise ValueError("No moves to undo")
+        row, col, piece = self.moves.pop()
+        self.grid[row][col] = BoardPiece.EMPTY
+        self.heights[col] -= 1
+        self._toggleHash(row, col, piece)
+        return row, col
+
+    def getLastMove(self) -> tuple[int, int, BoardPiece] | None:
+        return self.moves[-1] if self.moves else None
+
+    def getMoveCount(self) -> int:
+        return len(self.moves)
+
+    def isValidMove(self, col: int) -> bool:
+        return 0 <= col < self.cols and self.heights[col] < self.rows
+
+    def isFull(self) -> bool:
+        return len(self.moves) == self.rows * self.cols
     
     def checkWin(self, connectN: int, row: int, col: int, piece: BoardPiece) -> bool:
         count = 0
@@ -68,7 +133,7 @@ class Board:
         count = 0
         # check anti-diagonal for win
         for r in range(self.rows-1, -1, -1):
-            c = row - col + r
+            c = col - row + r
             if c >= 0 and c < self.cols and self.grid[r][c] == piece:
                 count += 1
             else:
@@ -76,4 +141,143 @@ class Board:
             if count == connectN:
                 return True
         
-        return False
\ No newline at end of file
+        return False
+
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+MASK64 = (1 << 64) - 1
+
+
+def cellHash(row: int, col: int, piece: BoardPiece) -> int:
+    # splitmix64 of the cell coordinates, standing in for a Zobrist table too large to allocate
+    x = (row * 0x9E3779B97F4A7C15 + col * 0xBF58476D1CE4E5B9 + piece.value * 0x94D049BB133111EB) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class SparseBoard:
+    # Same interface as Board, but only occupied cells are stored. For each direction
+    # `runs` holds the length of the same-coloured run at each run endpoint, so placing
+    # a piece merges the runs on either side in O(1) and the win check for the last
+    # move is a lookup. Memory grows with the number of pieces, not rows x cols.
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.init()
+
+    def init(self):
+        self.cells = {}
+        self.heights = {}
+        self.runs = [{} for _ in DIRECTIONS]
+        self.moves = []
+        self.hash = 0
+        self.mirrorHash = 0
+
+    def reset(self):
+        self.init()
+
+    def getPositionKey(self) -> int:
+        return min(self.hash, self.mirrorHash)
+
+    def isMirrored(self) -> bool:
+        return self.mirrorHash < self.hash
+
+    def _toggleHash(self, row: int, col: int, piece: BoardPiece):
+        self.hash ^= cellHash(row, col, piece)
+        self.mirrorHash ^= cellHash(row, self.cols - 1 - col, piece)
+
+    def getCols(self) -> int:
+        return self.cols
+
+    def getRows(self) -> int:
+        return self.rows
+
+    def getPiece(self, row: int, col: int) -> BoardPiece:
+        return self.cells.get((row, col), BoardPiece.EMPTY)
+
+    def getBoard(self) -> list[list[BoardPiece]]:
+        # materializes a dense grid; only meant for printing small boards
+        grid = [[BoardPiece.EMPTY] * self.cols for _ in range(self.rows)]
+        for (row, col), piece in self.cells.items():
+            grid[row][col] = piece
+        return grid
+
+    def placePiece(self, col: int, piece: BoardPiece) -> int:
+        if piece == BoardPiece.EMPTY:
+            raise ValueError("Invalid Piece")
+        if not 0 <= col < self.cols:
+            raise ValueError("Out of bounds")
+        height = self.heights.get(col, 0)
+        if height == self.rows:
+            return 0
+        row = self.rows - 1 - height
+        self.cells[(row, col)] = piece
+        self.heights[col] = height + 1
+        self._toggleHash(row, col, piece)
+
+        saved = []
+        lengths = []
+        for runs, (dr, dc) in zip(self.runs, DIRECTIONS):
+            before = (row - dr, col - dc)
+            after = (row + dr, col + dc)
+            left = runs[before] if self.cells.get(before) == piece else 0
+            right = runs[after] if self.cells.get(after) == piece else 0
+            length = left + right + 1
+            start = (row - dr * left, col - dc * left)
+            end = (row + dr * right, col + dc * right)
+            saved.append((start, runs.get(start), end, runs.get(end)))
+            runs[start] = length
+            runs[end] = length
+            lengths.append(length)
+
+        self.moves.append((row, col, piece, saved, lengths))
+        return row
+
+    def undoMove(self) -> tuple[int, int]:
+        if not self.moves:
+            raise ValueError("No moves to undo")
+        row, col, piece, saved, _ = self.moves.pop()
+        for runs, (start, oldStart, end, oldEnd) in zip(self.runs, saved):
+            for cell, old in ((end, oldEnd), (start, oldStart)):
+                if old is None:
+                    runs.pop(cell, None)
+                else:
+                    runs[cell] = old
+        del self.cells[(row, col)]
+        if self.heights[col] == 1:
+            del self.heights[col]
+        else:
+            self.heights[col] -= 1
+        self._toggleHash(row, col, piece)
+        return row, col
+
+    def getLastMove(self) -> tuple[int, int, BoardPiece] | None:
+        return self.moves[-1][:3] if self.moves else None
+
+    def getMoveCount(self) -> int:
+        return len(self.moves)
+
+    def isValidMove(self, col: int) -> bool:
+        return 0 <= col < self.cols and self.heights.get(col, 0) < self.rows
+
+    def isFull(self) -> bool:
+        return len(self.moves) == self.rows * self.cols
+
+    def checkWin(self, connectN: int, row: int, col: int, piece: BoardPiece) -> bool:
+        if self.moves and self.moves[-1][:3] == (row, col, piece):
+            return max(self.moves[-1][4]) >= connectN
+
+        # any other cell: walk at most connectN - 1 cells each way
+        if self.cells.get((row, col)) != piece:
+            return False
+        for dr, dc in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                for step in range(1, connectN):
+                    if self.cells.get((row + sign * dr * step, col + sign * dc * step)) != piece:
+                        break
+                    count += 1
+            if count >= connectN:
+                return True
+        return False
@@ -0,0 +1,94 @@
+import argparse
+import mmap
+import struct
+
+from board import Board, BoardPiece
+from engine import Engine, opponent
+
+MAGIC = b"C4BK"
+HEADER = struct.Struct("<4sBBBBI")
+ENTRY = struct.Struct("<QB")
+
+
+class OpeningBook:
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, self.rows, self.cols, self.connectN, self.count = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an opening book")
+
+    def lookup(self, board: Board, connectN: int) -> int | None:
+        # a book only answers for the board shape and win length it was built for
+        if (board.getRows(), board.getCols(), connectN) != (self.rows, self.cols, self.connectN):
+            return None
+        key, mirrored = board.getPositionKey(), board.isMirrored()
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            entryKey, move = ENTRY.unpack_from(self._data, HEADER.size + mid * ENTRY.size)
+            if entryKey < key:
+                low = mid + 1
+            elif entryKey > key:
+                high = mid
+            else:
+                return self.cols - 1 - move if mirrored else move
+        return None
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def buildBook(path: str, rows: int, cols: int, connectN: int, plies: int, depth: int) -> int:
+    board = Board(rows, cols)
+    engine = Engine(connectN, depth)
+    entries = {}
+
+    def visit(piece: BoardPiece, ply: int):
+        key, mirrored = board.getPositionKey(), board.isMirrored()
+        if key in entries:
+            return
+        col, _ = engine.search(board, piece)
+        if col is None:
+            return
+        entries[key] = cols - 1 - col if mirrored else col
+        if ply == plies:
+            return
+        for move in range(cols):
+            if not board.isValidMove(move):
+                continue
+            row = board.placePiece(move, piece)
+            if not board.checkWin(connectN, row, move, piece):
+                visit(opponent(piece), ply + 1)
+            board.undoMove()
+
+    visit(BoardPiece.RED, 0)
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, 1, rows, cols, connectN, len(entries)))
+        for key in sorted(entries):
+            f.write(ENTRY.pack(key, entries[key]))
+    return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a Connect Four opening book")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=7)
+    parser.add_argument("--connect", type=int, default=4)
+    parser.add_argument("--plies", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=8)
+    args = parser.parse_args()
+    count = buildBook(args.path, args.rows, args.cols, args.connect, args.plies, args.depth)
+    print(f"wrote {count} positions to {args.path}")
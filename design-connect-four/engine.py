@@ -0,0 +1,209 @@
+import math
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from board import Board, BoardPiece
+
+WIN_SCORE = 1_000_000
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+def opponent(piece: BoardPiece) -> BoardPiece:
+    return BoardPiece.RED if piece == BoardPiece.YELLOW else BoardPiece.YELLOW
+
+
+class Engine:
+    def __init__(self, connectN: int, maxDepth: int, book=None):
+        self.connectN = connectN
+        self.maxDepth = maxDepth
+        self.book = book
+        self.table = {}
+        self.nodes = 0
+
+    def getMoveOrder(self, board: Board) -> list[int]:
+        cols = board.getCols()
+        center = (cols - 1) / 2
+        return sorted(range(cols), key=lambda col: (abs(col - center), col))
+
+    def evaluate(self, board: Board, piece: BoardPiece) -> int:
+        # windows of connectN cells that only one side occupies, weighted by how full they are
+        grid = board.getBoard()
+        rows, cols = board.getRows(), board.getCols()
+        other = opponent(piece)
+        score = 0
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for row in range(rows):
+                for col in range(cols):
+                    endRow = row + dr * (self.connectN - 1)
+                    endCol = col + dc * (self.connectN - 1)
+                    if not (0 <= endRow < rows and 0 <= endCol < cols):
+                        continue
+                    mine = theirs = 0
+                    for i in range(self.connectN):
+                        cell = grid[row + dr * i][col + dc * i]
+                        if cell == piece:
+                            mine += 1
+                        elif cell == other:
+                            theirs += 1
+                    if theirs == 0:
+                        score += mine * mine
+                    elif mine == 0:
+                        score -= theirs * theirs
+        return score
+
+    def scoreMove(self, board: Board, col: int, piece: BoardPiece, depth: int, alpha: float, beta: float) -> float:
+        self.nodes += 1
+        row = board.placePiece(col, piece)
+        if board.checkWin(self.connectN, row, col, piece):
+            score = WIN_SCORE + depth
+        elif board.isFull():
+            score = 0
+        elif depth <= 1:
+            score = self.evaluate(board, piece)
+        else:
+            score = -self.negamax(board, opponent(piece), depth - 1, -beta, -alpha)
+        board.undoMove()
+        return score
+
+    def negamax(self, board: Board, piece: BoardPiece, depth: int, alpha: float, beta: float) -> float:
+        # side to move follows from the position, and mirror images share a score
+        key = board.getPositionKey()
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            _, flag, value = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            elif flag == UPPER:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        originalAlpha = alpha
+        best = -math.inf
+        for col in self.getMoveOrder(board):
+            if not board.isValidMove(col):
+                continue
+            score = self.scoreMove(board, col, piece, depth, alpha, beta)
+            best = max(best, score)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best == -math.inf:
+            return 0
+
+        if best <= originalAlpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, flag, best)
+        return best
+
+    def search(self, board: Board, piece: BoardPiece, depth: int = None) -> tuple[int, float]:
+        bookMove = self.book.lookup(board, self.connectN) if self.book else None
+        if bookMove is not None and board.isValidMove(bookMove):
+            return bookMove, 0
+        depth = depth or self.maxDepth
+        bestCol, bestScore = None, -math.inf
+        alpha = -math.inf
+        for col in self.getMoveOrder(board):
+            if not board.isValidMove(col):
+                continue
+            score = self.scoreMove(board, col, piece, depth, alpha, math.inf)
+            if score > bestScore:
+                bestCol, bestScore = col, score
+            alpha = max(alpha, score)
+        return bestCol, bestScore
+
+
+_sharedAlpha = None
+
+
+def _initWorker(sharedAlpha):
+    global _sharedAlpha
+    _sharedAlpha = sharedAlpha
+
+
+def _searchRootMove(board: Board, col: int, piece: BoardPiece, connectN: int, depth: int,
+                    alpha: float = -math.inf, shared: bool = False):
+    engine = Engine(connectN, depth)
+    if shared and _sharedAlpha is not None:
+        alpha = max(alpha, _sharedAlpha.value)
+    score = engine.scoreMove(board, col, piece, depth, alpha, math.inf)
+    if shared and _sharedAlpha is not None:
+        with _sharedAlpha.get_lock():
+            if score > _sharedAlpha.value:
+                _sharedAlpha.value = score
+    return col, score, engine.nodes
+
+
+class ParallelSearch:
+    # Root-move splitting: every legal root move is searched by its own worker process.
+    # In deterministic mode the first root move in move order is searched alone with a full
+    # window, and its score is a fixed alpha for all the others. A move that cannot beat it
+    # fails low, one that can returns its exact score, and results are reduced in move order,
+    # so the chosen column matches the serial search whatever the scheduling. Otherwise
+    # workers share the best root score found so far as their alpha bound, which prunes
+    # more but lets ties resolve in completion order.
+    def __init__(self, connectN: int, maxDepth: int, workers: int = None, deterministic: bool = True, book=None):
+        self.connectN = connectN
+        self.maxDepth = maxDepth
+        self.book = book
+        self.workers = workers or os.cpu_count()
+        self.deterministic = deterministic
+        self.nodes = 0
+        self._sharedAlpha = multiprocessing.Value('d', -math.inf)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_initWorker,
+            initargs=(self._sharedAlpha,),
+        )
+
+    def search(self, board: Board, piece: BoardPiece, depth: int = None) -> tuple[int, float]:
+        bookMove = self.book.lookup(board, self.connectN) if self.book else None
+        if bookMove is not None and board.isValidMove(bookMove):
+            return bookMove, 0
+        depth = depth or self.maxDepth
+        moves = [col for col in Engine(self.connectN, depth).getMoveOrder(board) if board.isValidMove(col)]
+        self._sharedAlpha.value = -math.inf
+        self.nodes = 0
+
+        if not moves:
+            return None, -math.inf
+        if self.deterministic:
+            first = self._pool.submit(_searchRootMove, board, moves[0], piece, self.connectN, depth).result()
+            futures = [
+                self._pool.submit(_searchRootMove, board, col, piece, self.connectN, depth, first[1])
+                for col in moves[1:]
+            ]
+            results = [first] + [future.result() for future in futures]
+        else:
+            futures = [
+                self._pool.submit(_searchRootMove, board, col, piece, self.connectN, depth, shared=True)
+                for col in moves
+            ]
+            results = [future.result() for future in as_completed(futures)]
+
+        bestCol, bestScore = None, -math.inf
+        for col, score, nodes in results:
+            self.nodes += nodes
+            if score > bestScore:
+                bestCol, bestScore = col, score
+        return bestCol, bestScore
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,13 +1,17 @@
 from board import BoardPiece, Board
 from player import Player
+from renderer import BoardRenderer
 
 class Game:
-    def __init__(self, grid: Board, connectN:int, targetScore: int):
+    def __init__(self, grid: Board, connectN:int, targetScore: int, players: list[Player] = None, recorder=None,
+                 renderer: BoardRenderer = None):
         self.connectN = connectN
         self.targetScore = targetScore
         self.board = grid
+        self.recorder = recorder
+        self.renderer = renderer or BoardRenderer(grid)
         
-        self.players = [
+        self.players = players or [
             Player("Player 1", BoardPiece.RED),
             Player("Player 2", BoardPiece.YELLOW),
         ]
@@ -17,47 +21,32 @@ class Game:
             self.score[player.getName()] = 0
     
     def printBoard(self):
-        str = []
-        board = self.board.getBoard()
-        ROWS, COLS = len(board), len(board[0])
-        
-        for row in range(ROWS):
-            row_str = []
-            for col in range(COLS):
-                if col == 0:
-                    row_str.append('|')
-                    
-                match board[row][col]:
-                    case BoardPiece.YELLOW:
-                        row_str.append(" Y ")
-                    case BoardPiece.RED:
-                        row_str.append(" R ")
-                    case BoardPiece.EMPTY:
-                        row_str.append("   ")
-
-                row_str.append("|")
-            str.append(''.join(row_str))
-        
-        print('\n'.join(str))
-        return '\n'.join(str)
+        return self.renderer.show()
     
     def playMove(self, player: Player) -> tuple[int,int]:
         self.printBoard()
-        print(f"{player.getName()}'s turn")
-        cols = self.board.getCols()
-        moveColumn = int(input(f"Enter column between 0 and {cols - 1} to add a piece: "))
+        self.renderer.announce(f"{player.getName()}'s turn")
+        moveColumn = player.chooseMove(self.board)
         moveRow = self.board.placePiece(moveColumn, player.getColor())
+        self.renderer.update(moveRow, moveColumn)
         return (moveRow, moveColumn)
         
     def playRound(self):
+        self.renderer.render()
+        if self.recorder:
+            self.recorder.startRound(self.board, self.players[0].getColor())
         while True:
             for player in self.players:
                 row, col = self.playMove(player)
+                if self.recorder:
+                    self.recorder.recordMove(col)
                 
                 pieceColor = player.getColor()
                 
                 if self.board.checkWin(self.connectN, row, col, pieceColor):
                     self.score[player.getName()] += 1
+                    if self.recorder:
+                        self.recorder.endRound(pieceColor, self.connectN)
                     return player
     
     def playGame(self):
@@ -65,7 +54,7 @@ class Game:
         winner = None
         while maxScore < self.targetScore:
             winner = self.playRound()
-            print(f"{winner.getName()} won the round")
+            self.renderer.announce(f"{winner.getName()} won the round")
             maxScore = max(self.score[winner.getName()], maxScore)
-            self.board.init()
-        print(f"{winner.getName()} won game")
\ No newline at end of file
+            self.board.reset()
+        self.renderer.announce(f"{winner.getName()} won game")
\ No newline at end of file
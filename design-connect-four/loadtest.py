@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = []
+        self.games = 0
+        self.errors = 0
+        self.active = 0
+        self.peakActive = 0
+
+    def percentile(self, p: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+
+async def playClient(host: str, port: int, opponent: str, depth: int, stats: LoadStats, rng: random.Random):
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def send(message: dict):
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+
+    heights = []
+    rows = 0
+    sentAt = None
+    try:
+        await send({"type": "join", "opponent": opponent, "depth": depth})
+        while True:
+            line = await reader.readline()
+            if not line:
+                stats.errors += 1
+                return
+            message = json.loads(line)
+            match message["type"]:
+                case "start":
+                    rows = message["rows"]
+                    heights = [0] * message["cols"]
+                    stats.active += 1
+                    stats.peakActive = max(stats.peakActive, stats.active)
+                case "turn":
+                    col = rng.choice([col for col, height in enumerate(heights) if height < rows])
+                    sentAt = time.perf_counter()
+                    await send({"type": "move", "col": col})
+                case "move":
+                    heights[message["col"]] += 1
+                    if sentAt is not None:
+                        stats.latencies.append(time.perf_counter() - sentAt)
+                        sentAt = None
+                case "end":
+                    stats.active -= 1
+                    stats.games += 1
+                    return
+                case "error":
+                    stats.errors += 1
+    finally:
+        writer.close()
+
+
+async def runLoad(host: str, port: int, clients: int, opponent: str, depth: int, seed: int) -> LoadStats:
+    stats = LoadStats()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(playClient(host, port, opponent, depth, stats, random.Random(rng.random()))
+                           for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    # two clients share a game unless they play the engine
+    games = stats.games if opponent == "engine" else stats.games // 2
+    peak = stats.peakActive if opponent == "engine" else stats.peakActive // 2
+    print(f"{games} games in {elapsed:.2f}s, peak concurrent games {peak}, errors {stats.errors}")
+    if stats.latencies:
+        print(f"move latency ms: p50 {stats.percentile(50):.2f} p95 {stats.percentile(95):.2f} "
+              f"p99 {stats.percentile(99):.2f} mean {statistics.mean(stats.latencies) * 1000:.2f}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for the Connect Four game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--opponent", choices=["human", "engine"], default="human")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(runLoad(args.host, args.port, args.clients, args.opponent, args.depth, args.seed))
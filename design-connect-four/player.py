@@ -1,4 +1,7 @@
-from board import BoardPiece
+import random
+
+from board import BoardPiece, Board
+from engine import Engine
 
 class Player:
     def __init__(self, name: str, color: BoardPiece):
@@ -9,4 +12,25 @@ class Player:
         return self.name
     
     def getColor(self):
-        return self.color
\ No newline at end of file
+        return self.color
+
+    def chooseMove(self, board: Board) -> int:
+        cols = board.getCols()
+        return int(input(f"Enter column between 0 and {cols - 1} to add a piece: "))
+
+class RandomPlayer(Player):
+    def __init__(self, name: str, color: BoardPiece, seed: int = None):
+        super().__init__(name, color)
+        self.random = random.Random(seed)
+
+    def chooseMove(self, board: Board) -> int:
+        return self.random.choice([col for col in range(board.getCols()) if board.isValidMove(col)])
+
+class EnginePlayer(Player):
+    def __init__(self, name: str, color: BoardPiece, connectN: int, depth: int, book=None):
+        super().__init__(name, color)
+        self.engine = Engine(connectN, depth, book=book)
+
+    def chooseMove(self, board: Board) -> int:
+        col, _ = self.engine.search(board, self.color)
+        return col
@@ -0,0 +1,182 @@
+import argparse
+import mmap
+import random
+import struct
+import time
+
+from board import Board, BoardPiece
+
+MAGIC = b"C4GR"
+VERSION = 2
+FILE_HEADER = struct.Struct("<4sB")
+# rows, cols, connectN, firstPiece, winner, moveCount; version 1 had one byte per shape field
+RECORD_HEADERS = {1: struct.Struct("<BBBBBH"), 2: struct.Struct("<HHHBBI")}
+RECORD_HEADER = RECORD_HEADERS[VERSION]
+MAX_DIMENSION = 0xFFFF
+DRAW = 0
+
+
+def packMoves(moves: list[int], cols: int) -> bytes:
+    # one nibble per move when every column fits in four bits, one byte up to 256 columns,
+    # otherwise two bytes little-endian
+    if cols > 256:
+        return struct.pack(f"<{len(moves)}H", *moves)
+    if cols > 16:
+        return bytes(moves)
+    packed = bytearray((len(moves) + 1) // 2)
+    for i, col in enumerate(moves):
+        packed[i // 2] |= col << (4 * (i % 2))
+    return bytes(packed)
+
+
+def unpackMoves(packed, count: int, cols: int) -> list[int]:
+    if cols > 256:
+        return list(struct.unpack_from(f"<{count}H", packed))
+    if cols > 16:
+        return list(packed[:count])
+    return [(packed[i // 2] >> (4 * (i % 2))) & 0x0F for i in range(count)]
+
+
+def packedSize(count: int, cols: int) -> int:
+    if cols > 256:
+        return 2 * count
+    return count if cols > 16 else (count + 1) // 2
+
+
+class GameRecordWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "a+b")
+        if self._file.tell() == 0:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        else:
+            self._file.seek(0)
+            magic, version = FILE_HEADER.unpack(self._file.read(FILE_HEADER.size))
+            if magic != MAGIC:
+                self._file.close()
+                raise ValueError("Not a game record file")
+            if version != VERSION:
+                self._file.close()
+                raise ValueError(f"Cannot append to a version {version} game record file")
+        self._board = None
+        self._firstPiece = None
+        self._moves = []
+
+    def startRound(self, board: Board, firstPiece: BoardPiece):
+        if max(board.getRows(), board.getCols()) > MAX_DIMENSION:
+            raise ValueError(f"Game records hold boards of at most {MAX_DIMENSION} rows and columns")
+        self._board = board
+        self._firstPiece = firstPiece
+        self._moves = []
+
+    def recordMove(self, col: int):
+        self._moves.append(col)
+
+    def endRound(self, winner: BoardPiece | None, connectN: int):
+        if connectN > MAX_DIMENSION:
+            raise ValueError(f"Game records hold connectN of at most {MAX_DIMENSION}")
+        cols = self._board.getCols()
+        self._file.write(RECORD_HEADER.pack(
+            self._board.getRows(), cols, connectN, self._firstPiece.value,
+            winner.value if winner else DRAW, len(self._moves),
+        ))
+        self._file.write(packMoves(self._moves, cols))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def iterRecords(path: str):
+    # yields (rows, cols, connectN, firstPiece, winner, moveCount, packedMoves) per game;
+    # moves stay packed, so nothing is decoded unless the caller asks for it
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version = FILE_HEADER.unpack_from(data, 0)
+            if magic != MAGIC:
+                raise ValueError("Not a game record file")
+            if version not in RECORD_HEADERS:
+                raise ValueError(f"Unsupported game record version {version}")
+            header = RECORD_HEADERS[version]
+            offset = FILE_HEADER.size
+            end = len(data)
+            while offset < end:
+                rows, cols, connectN, firstPiece, winner, count = header.unpack_from(data, offset)
+                offset += header.size
+                size = packedSize(count, cols)
+                yield rows, cols, connectN, firstPiece, winner, count, data[offset:offset + size]
+                offset += size
+        finally:
+            data.close()
+
+
+def analyze(path: str) -> dict:
+    games = 0
+    totalMoves = 0
+    firstPlayerWins = 0
+    draws = 0
+    byFirstMove = {}
+    for rows, cols, connectN, firstPiece, winner, count, packed in iterRecords(path):
+        games += 1
+        totalMoves += count
+        if winner == DRAW:
+            draws += 1
+        elif winner == firstPiece:
+            firstPlayerWins += 1
+        if count:
+            firstMove = unpackMoves(packed, 1, cols)[0]
+            stats = byFirstMove.setdefault(firstMove, [0, 0, 0])
+            stats[0] += 1
+            if winner == firstPiece:
+                stats[1] += 1
+            elif winner == DRAW:
+                stats[2] += 1
+
+    return {
+        "games": games,
+        "averageLength": totalMoves / games if games else 0,
+        "firstPlayerWinRate": firstPlayerWins / games if games else 0,
+        "drawRate": draws / games if games else 0,
+        "firstMoveWinRate": {col: wins / played for col, (played, wins, _) in sorted(byFirstMove.items())},
+    }
+
+
+def writeRandomGames(path: str, games: int, rows: int = 6, cols: int = 7, connectN: int = 4, seed: int = 0):
+    rng = random.Random(seed)
+    board = Board(rows, cols)
+    pieces = (BoardPiece.RED, BoardPiece.YELLOW)
+    with GameRecordWriter(path) as writer:
+        for _ in range(games):
+            board.reset()
+            writer.startRound(board, pieces[0])
+            winner = None
+            turn = 0
+            while winner is None and not board.isFull():
+                col = rng.choice([col for col in range(cols) if board.isValidMove(col)])
+                row = board.placePiece(col, pieces[turn % 2])
+                writer.recordMove(col)
+                if board.checkWin(connectN, row, col, pieces[turn % 2]):
+                    winner = pieces[turn % 2]
+                turn += 1
+            writer.endRound(winner, connectN)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming analytics over Connect Four game records")
+    parser.add_argument("path")
+    parser.add_argument("--generate", type=int, default=0, help="append this many random games first")
+    args = parser.parse_args()
+    if args.generate:
+        writeRandomGames(args.path, args.generate)
+    start = time.perf_counter()
+    summary = analyze(args.path)
+    elapsed = time.perf_counter() - start
+    print(f"{summary['games']} games in {elapsed:.2f}s, average length {summary['averageLength']:.1f} moves")
+    print(f"first player win rate {summary['firstPlayerWinRate']:.3f}, draw rate {summary['drawRate']:.3f}")
+    for col, rate in summary["firstMoveWinRate"].items():
+        print(f"  first move {col}: win rate {rate:.3f}")
@@ -0,0 +1,114 @@
+import sys
+
+from board import Board, BoardPiece
+
+CELLS = {
+    BoardPiece.YELLOW: " Y ",
+    BoardPiece.RED: " R ",
+    BoardPiece.EMPTY: "   ",
+}
+CELL_WIDTH = 4
+
+
+class BoardRenderer:
+    # Keeps one cached string per row; a move patches the single cell that changed
+    # instead of rebuilding every cell of the board.
+    def __init__(self, board: Board, stream=None):
+        self.board = board
+        self.stream = stream
+        self.rows = []
+
+    def renderRow(self, row: int) -> str:
+        return '|' + '|'.join(CELLS[self.board.getPiece(row, col)] for col in range(self.board.getCols())) + '|'
+
+    def render(self) -> str:
+        self.rows = [self.renderRow(row) for row in range(self.board.getRows())]
+        text = '\n'.join(self.rows)
+        self.emitFull(text)
+        return text
+
+    def update(self, row: int, col: int):
+        if not self.rows:
+            self.render()
+            return
+        start = 1 + col * CELL_WIDTH
+        line = self.rows[row]
+        self.rows[row] = line[:start] + CELLS[self.board.getPiece(row, col)] + line[start + CELL_WIDTH - 1:]
+        self.emitRow(row, self.rows[row])
+
+    def show(self) -> str:
+        if not self.rows:
+            self.render()
+        text = '\n'.join(self.rows)
+        self.emitShow(text)
+        return text
+
+    def emitFull(self, text: str):
+        pass
+
+    def emitRow(self, row: int, text: str):
+        pass
+
+    def emitShow(self, text: str):
+        print(text, file=self.stream)
+
+    def announce(self, message: str):
+        # game messages such as whose turn it is go through the renderer, so a headless run is silent
+        print(message, file=self.stream)
+
+
+class TerminalRenderer(BoardRenderer):
+    # draws the board once at the top of the screen, then rewrites only changed rows in place
+    def emitFull(self, text: str):
+        stream = self.stream or sys.stdout
+        stream.write("\x1b[2J\x1b[H" + text + "\n")
+        stream.flush()
+
+    def emitRow(self, row: int, text: str):
+        stream = self.stream or sys.stdout
+        stream.write(f"\x1b7\x1b[{row + 1};1H{text}\x1b8")
+        stream.flush()
+
+    def emitShow(self, text: str):
+        pass
+
+    def announce(self, message: str):
+        # messages replace a fixed status line under the board, then the cursor waits on the
+        # cleared line below it for the move prompt, so turns never scroll the board away
+        stream = self.stream or sys.stdout
+        stream.write(f"\x1b[{self.board.getRows() + 1};1H{message}\x1b[K\r\n\x1b[K")
+        stream.flush()
+
+
+class SpectatorRenderer(BoardRenderer):
+    # sends a full snapshot once, then a diff per changed row, to a callback such as a socket writer
+    def __init__(self, board: Board, sink):
+        super().__init__(board)
+        self.sink = sink
+
+    def emitFull(self, text: str):
+        self.sink({"type": "full", "rows": list(self.rows)})
+
+    def emitRow(self, row: int, text: str):
+        self.sink({"type": "row", "row": row, "text": text})
+
+    def emitShow(self, text: str):
+        pass
+
+    def announce(self, message: str):
+        self.sink({"type": "message", "text": message})
+
+
+class NullRenderer(BoardRenderer):
+    # for headless runs: keeps no cache and produces no output
+    def render(self) -> str:
+        return ""
+
+    def update(self, row: int, col: int):
+        pass
+
+    def show(self) -> str:
+        return ""
+
+    def announce(self, message: str):
+        pass
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board, BoardPiece
+from engine import Engine
+
+
+def _engineMove(board: Board, piece: BoardPiece, connectN: int, depth: int) -> int:
+    col, _ = Engine(connectN, depth).search(board, piece)
+    return col
+
+
+class Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, message: dict):
+        self.writer.write(json.dumps(message).encode() + b"\n")
+        await self.writer.drain()
+
+    async def receive(self) -> dict:
+        # ValueError for anything but one JSON object per line (JSONDecodeError is a ValueError)
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Client disconnected")
+        message = json.loads(line)
+        if not isinstance(message, dict):
+            raise ValueError("Expected a JSON object")
+        return message
+
+    def close(self):
+        self.writer.close()
+
+
+class RemoteSeat:
+    def __init__(self, connection: Connection, color: BoardPiece):
+        self.connection = connection
+        self.color = color
+
+    async def chooseMove(self, board: Board) -> int:
+        await self.connection.send({"type": "turn"})
+        while True:
+            try:
+                message = await self.connection.receive()
+            except ValueError:
+                await self.connection.send({"type": "error", "message": "Invalid message"})
+                continue
+            col = message.get("col")
+            # type() rather than isinstance(): JSON true/false decode to bool, a subclass of int
+            if message.get("type") == "move" and type(col) is int and board.isValidMove(col):
+                return col
+            await self.connection.send({"type": "error", "message": "Invalid move"})
+
+    async def send(self, message: dict):
+        await self.connection.send(message)
+
+
+class EngineSeat:
+    def __init__(self, pool: ProcessPoolExecutor, color: BoardPiece, connectN: int, depth: int):
+        self.pool = pool
+        self.color = color
+        self.connectN = connectN
+        self.depth = depth
+
+    async def chooseMove(self, board: Board) -> int:
+        # the search runs in a worker process so it never blocks the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, _engineMove, board, self.color, self.connectN, self.depth)
+
+    async def send(self, message: dict):
+        pass
+
+
+class GameSession:
+    def __init__(self, seats: list, rows: int, cols: int, connectN: int, moveTimeout: float):
+        self.seats = seats
+        self.board = Board(rows, cols)
+        self.connectN = connectN
+        self.moveTimeout = moveTimeout
+
+    async def broadcast(self, message: dict):
+        await asyncio.gather(*(seat.send(message) for seat in self.seats), return_exceptions=True)
+
+    async def play(self) -> BoardPiece | None:
+        for i, seat in enumerate(self.seats):
+            try:
+                await seat.send({"type": "start", "color": seat.color.name, "rows": self.board.getRows(),
+                                 "cols": self.board.getCols(), "connectN": self.connectN})
+            except ConnectionError:
+                # left before the first move: the opponent still gets an end message
+                other = self.seats[(i + 1) % 2]
+                await self.broadcast({"type": "end", "winner": other.color.name, "reason": "disconnect"})
+                return other.color
+        turn = 0
+        while not self.board.isFull():
+            seat = self.seats[turn % 2]
+            other = self.seats[(turn + 1) % 2]
+            try:
+                col = await asyncio.wait_for(seat.chooseMove(self.board), self.moveTimeout)
+            except asyncio.TimeoutError:
+                await self.broadcast({"type": "end", "winner": other.color.name, "reason": "timeout"})
+                return other.color
+            except ConnectionError:
+                await self.broadcast({"type": "end", "winner": other.color.name, "reason": "disconnect"})
+                return other.color
+
+            row = self.board.placePiece(col, seat.color)
+            await self.broadcast({"type": "move", "color": seat.color.name, "row": row, "col": col})
+            if self.board.checkWin(self.connectN, row, col, seat.color):
+                await self.broadcast({"type": "end", "winner": seat.color.name, "reason": "connect"})
+                return seat.color
+            turn += 1
+
+        await self.broadcast({"type": "end", "winner": None, "reason": "draw"})
+        return None
+
+
+class GameServer:
+    def __init__(self, rows: int = 6, cols: int = 7, connectN: int = 4, moveTimeout: float = 30.0,
+                 engineWorkers: int = None, maxEngineDepth: int = 8):
+        self.rows = rows
+        self.cols = cols
+        self.connectN = connectN
+        self.moveTimeout = moveTimeout
+        # clients choose the engine's depth, so it is capped to keep worker processes responsive
+        self.maxEngineDepth = maxEngineDepth
+        self.pool = ProcessPoolExecutor(max_workers=engineWorkers or os.cpu_count())
+        self.waiting = asyncio.Queue()
+        self.activeGames = 0
+        self.gamesPlayed = 0
+
+    async def handleClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(reader, writer)
+        try:
+            request = await connection.receive()
+            if request.get("type") != "join":
+                await connection.send({"type": "error", "message": "Expected join"})
+                return
+            if request.get("opponent") == "engine":
+                depth = request.get("depth", 4)
+                if type(depth) is not int or depth < 1:
+                    await connection.send({"type": "error", "message": "Expected a positive integer depth"})
+                    return
+                depth = min(depth, self.maxEngineDepth)
+                seats = [RemoteSeat(connection, BoardPiece.RED),
+                         EngineSeat(self.pool, BoardPiece.YELLOW, self.connectN, depth)]
+                await self.runSession(seats)
+            else:
+                # the connection is handed to the matchmaker, which closes it after the game
+                done = asyncio.Event()
+                await self.waiting.put((connection, done))
+                await done.wait()
+        except ConnectionError:
+            pass
+        except ValueError as e:
+            try:
+                await connection.send({"type": "error", "message": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            connection.close()
+
+    async def matchmaker(self):
+        while True:
+            first, firstDone = await self.waiting.get()
+            second, secondDone = await self.waiting.get()
+            seats = [RemoteSeat(first, BoardPiece.RED), RemoteSeat(second, BoardPiece.YELLOW)]
+            task = asyncio.create_task(self.runSession(seats))
+            task.add_done_callback(lambda _, events=(firstDone, secondDone): [event.set() for event in events])
+
+    async def runSession(self, seats: list):
+        self.activeGames += 1
+        try:
+            await GameSession(seats, self.rows, self.cols, self.connectN, self.moveTimeout).play()
+        finally:
+            self.activeGames -= 1
+            self.gamesPlayed += 1
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handleClient, host, port, limit=2 ** 16)
+        matchmaker = asyncio.create_task(self.matchmaker())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            matchmaker.cancel()
+            self.pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connect Four game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--move-timeout", type=float, default=30.0)
+    parser.add_argument("--engine-workers", type=int, default=None)
+    parser.add_argument("--max-engine-depth", type=int, default=8)
+    args = parser.parse_args()
+    server = GameServer(moveTimeout=args.move_timeout, engineWorkers=args.engine_workers,
+                        maxEngineDepth=args.max_engine_depth)
+    asyncio.run(server.serve(args.host, args.port))
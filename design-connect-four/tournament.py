@@ -0,0 +1,137 @@
+import argparse
+import itertools
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board, BoardPiece
+from player import Player, RandomPlayer, EnginePlayer
+
+WIN = 1.0
+DRAW = 0.5
+LOSS = 0.0
+
+
+def playHeadless(board: Board, connectN: int, players: list[Player], opening: list[int]) -> Player | None:
+    # plays one game to completion without printing; returns the winner or None on a draw
+    board.reset()
+    turn = 0
+    for col in opening:
+        board.placePiece(col, players[turn % 2].getColor())
+        turn += 1
+    while not board.isFull():
+        player = players[turn % 2]
+        col = player.chooseMove(board)
+        row = board.placePiece(col, player.getColor())
+        if board.checkWin(connectN, row, col, player.getColor()):
+            return player
+        turn += 1
+    return None
+
+
+def randomOpening(board: Board, connectN: int, plies: int, rng: random.Random) -> list[int]:
+    # random opening moves that do not already decide the game
+    board.reset()
+    opening = []
+    pieces = (BoardPiece.RED, BoardPiece.YELLOW)
+    for ply in range(plies):
+        col = rng.choice([col for col in range(board.getCols()) if board.isValidMove(col)])
+        row = board.placePiece(col, pieces[ply % 2])
+        if board.checkWin(connectN, row, col, pieces[ply % 2]):
+            break
+        opening.append(col)
+    return opening
+
+
+def _playPair(rows: int, cols: int, connectN: int, specA: tuple, specB: tuple, opening: list[int]) -> list[float]:
+    # plays the same opening with each side moving first and returns A's scores
+    board = Board(rows, cols)
+    scores = []
+    for aFirst in (True, False):
+        colors = (BoardPiece.RED, BoardPiece.YELLOW) if aFirst else (BoardPiece.YELLOW, BoardPiece.RED)
+        playerA = specA[0]("A", colors[0], **specA[1])
+        playerB = specB[0]("B", colors[1], **specB[1])
+        players = [playerA, playerB] if aFirst else [playerB, playerA]
+        winner = playHeadless(board, connectN, players, opening)
+        if winner is None:
+            scores.append(DRAW)
+        else:
+            scores.append(WIN if winner is playerA else LOSS)
+    return scores
+
+
+def eloDifference(pairs: list[list[float]], z: float = 1.96) -> tuple[float, float, float]:
+    # Elo of A over B with a Wilson interval on the mean score. The two games of a pair share
+    # an opening, so the pair's mean score is the independent sample. A score in [0, 1] with
+    # mean p has variance at most p(1 - p), so Wilson's interval holds for it, and unlike the
+    # normal approximation it stays open when every pair is won, drawn or lost.
+    n = len(pairs)
+    mean = sum(sum(scores) / len(scores) for scores in pairs) / n
+    denominator = 1 + z * z / n
+    center = (mean + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(mean * (1 - mean) / n + z * z / (4 * n * n)) / denominator
+
+    def toElo(score: float) -> float:
+        score = min(max(score, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / score - 1)
+
+    return toElo(mean), toElo(center - margin), toElo(center + margin)
+
+
+class Tournament:
+    def __init__(self, policies: dict[str, tuple], rows: int = 6, cols: int = 7, connectN: int = 4,
+                 openingPlies: int = 2, workers: int = None, seed: int = 0):
+        self.policies = policies
+        self.rows = rows
+        self.cols = cols
+        self.connectN = connectN
+        self.openingPlies = openingPlies
+        self.workers = workers or os.cpu_count()
+        self.seed = seed
+
+    def run(self, gamesPerPair: int) -> dict[tuple[str, str], list[list[float]]]:
+        # A's scores per pair of games played from one opening with each side moving first
+        rng = random.Random(self.seed)
+        board = Board(self.rows, self.cols)
+        pairs = list(itertools.combinations(self.policies, 2))
+        results = {pair: [] for pair in pairs}
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            jobs = []
+            for nameA, nameB in pairs:
+                for _ in range((gamesPerPair + 1) // 2):
+                    opening = randomOpening(board, self.connectN, self.openingPlies, rng)
+                    future = pool.submit(_playPair, self.rows, self.cols, self.connectN,
+                                         self.policies[nameA], self.policies[nameB], opening)
+                    jobs.append(((nameA, nameB), future))
+            for pair, future in jobs:
+                results[pair].append(future.result())
+        return results
+
+    def report(self, results: dict[tuple[str, str], list[list[float]]]) -> str:
+        lines = []
+        for (nameA, nameB), pairs in results.items():
+            scores = [score for pair in pairs for score in pair]
+            wins = scores.count(WIN)
+            draws = scores.count(DRAW)
+            losses = scores.count(LOSS)
+            elo, low, high = eloDifference(pairs)
+            lines.append(f"{nameA} vs {nameB}: +{wins} ={draws} -{losses} "
+                         f"elo {elo:+.0f} [{low:+.0f}, {high:+.0f}]")
+        return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Connect Four self-play tournament")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tournament = Tournament({
+        "random": (RandomPlayer, {}),
+        "depth2": (EnginePlayer, {"connectN": 4, "depth": 2}),
+        "depth4": (EnginePlayer, {"connectN": 4, "depth": 4}),
+    }, workers=args.workers, seed=args.seed)
+    print(tournament.report(tournament.run(args.games)))
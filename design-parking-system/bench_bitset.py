@@ -0,0 +1,152 @@
+import random
+import sys
+import time
+import tracemalloc
+
+from parking import FreeRunIndex, ParkingFloor, SpotBitset, Vehicle
+
+SPOTS = 1_000_000
+SEARCHES = 200
+FLOOR_SPOTS = 200_000
+CHURN = 0.1
+WALK_INS = 2000
+
+
+def listFindRun(spots: list[int], length: int) -> int | None:
+    # the original ParkingFloor.addVehicle scan
+    start = 0
+    for end in range(len(spots)):
+        if spots[end] != 0:
+            start = end + 1
+        if end - start + 1 == length:
+            return start
+    return None
+
+
+def fragment(seed: int) -> tuple[list[int], SpotBitset]:
+    # mostly full floor: every free gap is shorter than a Semi until near the end
+    rng = random.Random(seed)
+    spots = [1] * SPOTS
+    bitset = SpotBitset(SPOTS)
+    bitset.setRange(0, SPOTS - 1, 1)
+    for spot in range(0, SPOTS, 3):
+        if rng.random() < 0.5:
+            spots[spot] = 0
+            bitset.setRange(spot, spot, 0)
+    tail = SPOTS - rng.randrange(SPOTS // 4)
+    spots[tail:tail + 3] = [0, 0, 0]
+    bitset.setRange(tail, tail + 2, 0)
+    return spots, bitset
+
+
+class ListFloor:
+    # the original ParkingFloor: a list of 0/1 ints and a linear scan per walk-in
+    def __init__(self, spots: int):
+        self.spots = [0] * spots
+        self.vehicles = {}
+
+    def addVehicle(self, vehicle: Vehicle) -> bool:
+        start = listFindRun(self.spots, vehicle.getSpotSize())
+        if start is None:
+            return False
+        self.vehicles[vehicle] = [start, start + vehicle.getSpotSize() - 1]
+        self.spots[start:start + vehicle.getSpotSize()] = [1] * vehicle.getSpotSize()
+        return True
+
+    def removeVehicle(self, vehicle: Vehicle):
+        start, end = self.vehicles.pop(vehicle)
+        self.spots[start:end + 1] = [0] * (end - start + 1)
+
+
+def churnedFloor(floor: ParkingFloor, seed: int) -> list[Vehicle]:
+    # fill the floor, then empty a random CHURN share of its vehicles
+    rng = random.Random(seed)
+    vehicles = []
+    while True:
+        vehicle = Vehicle(rng.choice((1, 1, 1, 2, 3)))
+        if not floor.addVehicle(vehicle):
+            break
+        vehicles.append(vehicle)
+    rng.shuffle(vehicles)
+    for vehicle in vehicles[:int(len(vehicles) * CHURN)]:
+        floor.removeVehicle(vehicle)
+    return vehicles[int(len(vehicles) * CHURN):]
+
+
+def tracedBytes(build) -> int:
+    tracemalloc.start()
+    built = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return size
+
+
+def walkIns(floor, parked: list[Vehicle], seed: int) -> float:
+    # seconds per walk-in on a floor in steady use: each arrival parks in the lowest gap that
+    # fits and a random parked vehicle leaves, so the low gaps fill up as they would in service
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(WALK_INS):
+        vehicle = Vehicle(rng.choice((1, 1, 1, 2, 3)))
+        if floor.addVehicle(vehicle):
+            parked.append(vehicle)
+        leaving = rng.randrange(len(parked))
+        parked[leaving], parked[-1] = parked[-1], parked[leaving]
+        floor.removeVehicle(parked.pop())
+    return (time.perf_counter() - start) / WALK_INS
+
+
+if __name__ == "__main__":
+    spots, bitset = fragment(0)
+    listBytes = sys.getsizeof(spots)
+    bitsetBytes = sys.getsizeof(bitset.bits)
+    print(f"memory for {SPOTS:,} spots: list {listBytes / SPOTS:.2f} B/spot, "
+          f"bitset {bitsetBytes / SPOTS:.3f} B/spot ({listBytes / bitsetBytes:.0f}x smaller)")
+
+    listTimes = {}
+    for length in (1, 3):
+        start = time.perf_counter()
+        expected = [listFindRun(spots, length) for _ in range(SEARCHES // 20)]
+        listTime = listTimes[length] = (time.perf_counter() - start) / (SEARCHES // 20)
+        start = time.perf_counter()
+        found = [bitset.findFreeRun(length) for _ in range(SEARCHES)]
+        bitsetTime = (time.perf_counter() - start) / SEARCHES
+        assert found[0] == expected[0]
+        print(f"find run of {length}: list scan {listTime * 1e3:.3f} ms, bitset {bitsetTime * 1e3:.3f} ms "
+              f"({listTime / bitsetTime:.1f}x)")
+
+    # a whole floor: the bitset plus the free-run index that walk-ins allocate from
+    floor = ParkingFloor(FLOOR_SPOTS)
+    parked = churnedFloor(floor, seed=1)
+    runs = len(floor.freeRuns.getRuns())
+    # the index owns the floor's bitset, so this is the whole occupancy footprint
+    floorBytes = tracedBytes(lambda: FreeRunIndex.fromBits(SpotBitset.fromBytes(FLOOR_SPOTS, floor.spots.toBytes())))
+    listBytes = tracedBytes(lambda: [0] * FLOOR_SPOTS)
+    print(f"{FLOOR_SPOTS:,}-spot floor after {CHURN:.0%} churn ({runs:,} free runs): "
+          f"bitset and free-run index {floorBytes / FLOOR_SPOTS:.2f} B/spot, "
+          f"list {listBytes / FLOOR_SPOTS:.2f} B/spot ({listBytes / floorBytes:.1f}x smaller)")
+
+    # same layout on the list floor; filling it through its own scan would take minutes
+    listFloor = ListFloor(FLOOR_SPOTS)
+    listFloor.spots = list(floor.spots)
+    listFloor.vehicles = {vehicle: list(spots) for vehicle, spots in floor.vehicles.items()}
+    listParked = list(parked)
+    indexedTime = walkIns(floor, parked, seed=2)
+    listTime = walkIns(listFloor, listParked, seed=2)
+    assert list(floor.spots) == listFloor.spots
+    print(f"{WALK_INS:,} walk-ins with departures on that floor: list {listTime * 1e6:.1f} us, "
+          f"ParkingFloor {indexedTime * 1e6:.1f} us ({listTime / indexedTime:.1f}x faster)")
+
+    # walk-ins allocate from the free-run index, not SpotBitset.findFreeRun: a Semi on the
+    # million-spot floor from the start, where the only run of 3 is near the end
+    index = FreeRunIndex.fromRuns(SPOTS, bitset.iterFreeRuns())
+    start = time.perf_counter()
+    for _ in range(SEARCHES):
+        semiStart = index.findFirstFit(3)
+        index.allocate(semiStart, semiStart + 2)
+        index.release(semiStart, semiStart + 2)
+    indexTime = (time.perf_counter() - start) / SEARCHES
+    assert semiStart == expected[0]
+    print(f"Semi walk-in on {SPOTS:,} fragmented spots: list scan {listTimes[3] * 1e3:.3f} ms, "
+          f"free-run index {indexTime * 1e6:.1f} us ({listTimes[3] / indexTime:.0f}x faster)")
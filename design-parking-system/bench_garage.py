@@ -0,0 +1,54 @@
+import random
+import time
+
+from parking import ParkingGarage, Vehicle, Car, Limo, Semi
+
+FLOORS = 50
+SPOTS_PER_FLOOR = 200
+OPERATIONS = 200_000
+
+
+class LinearScanGarage(ParkingGarage):
+    # the previous garage behaviour: try every floor in turn, probe every floor on removal
+    def parkVehicle(self, vehicle: Vehicle) -> bool:
+        for floor in self.floors:
+            if floor.addVehicle(vehicle):
+                return True
+        return False
+
+    def removeVehicle(self, vehicle: Vehicle):
+        for floor in self.floors:
+            if floor.getVehicleSpots(vehicle=vehicle):
+                floor.removeVehicle(vehicle=vehicle)
+                return True
+        return False
+
+
+def churn(garage: ParkingGarage, seed: int) -> tuple[float, int]:
+    rng = random.Random(seed)
+    parked = []
+    vehicle = Car()
+    while garage.parkVehicle(vehicle):
+        parked.append(vehicle)
+        vehicle = rng.choice((Car, Limo, Semi))()
+    rejected = 0
+    start = time.perf_counter()
+    for _ in range(OPERATIONS):
+        # keep the garage near capacity so both park and remove stay busy
+        if parked and rng.random() < 0.5:
+            vehicle = parked.pop(rng.randrange(len(parked)))
+            garage.removeVehicle(vehicle)
+        else:
+            vehicle = rng.choice((Car, Car, Car, Limo, Semi))()
+            if garage.parkVehicle(vehicle):
+                parked.append(vehicle)
+            else:
+                rejected += 1
+    return time.perf_counter() - start, rejected
+
+
+if __name__ == "__main__":
+    for name, garageType in (("linear scan", LinearScanGarage), ("indexed", ParkingGarage)):
+        garage = garageType(FLOORS, SPOTS_PER_FLOOR)
+        elapsed, rejected = churn(garage, seed=2)
+        print(f"{name}: {OPERATIONS} ops in {elapsed:.2f}s ({OPERATIONS / elapsed:,.0f} ops/s), {rejected} rejected")
@@ -0,0 +1,181 @@
+import array
+import math
+import random
+import threading
+import time
+
+SECONDS_PER_HOUR = 3600
+# sizes are stored as unsigned bytes
+MAX_SIZE = 255
+
+
+class RateTable:
+    # tiers are (hours, ratePerHour) pairs applied in order; the last tier covers every
+    # remaining hour. Sessions are billed per started hour.
+    def __init__(self, tiers: list[tuple[float, float]]):
+        self.tiers = tiers
+
+    def getBounds(self) -> list[tuple[float, float, float]]:
+        bounds = []
+        lower = 0.0
+        for i, (hours, rate) in enumerate(self.tiers):
+            upper = math.inf if i == len(self.tiers) - 1 else lower + hours
+            bounds.append((lower, upper, rate))
+            lower = upper
+        return bounds
+
+    def charge(self, seconds: float) -> float:
+        hours = math.ceil(seconds / SECONDS_PER_HOUR)
+        total = 0.0
+        for lower, upper, rate in self.getBounds():
+            if hours <= lower:
+                break
+            total += (min(hours, upper) - lower) * rate
+        return total
+
+    @classmethod
+    def flat(cls, rate: float) -> "RateTable":
+        return cls([(math.inf, rate)])
+
+
+class BillingEngine:
+    # Sessions live in parallel typed arrays (entry time, exit time, vehicle size) rather than
+    # one object per session, so a whole day can be handed to NumPy without copying field by field.
+    # The lock covers the arrays: gates append sessions while a report copies them out.
+    # Sizes without their own rate table are billed from `fallback` when there is one.
+    def __init__(self, rateTables: dict[int, RateTable], fallback: RateTable = None):
+        self.rateTables = rateTables
+        self.fallback = fallback
+        self.entries = array.array("d")
+        self.exits = array.array("d")
+        self.sizes = array.array("B")
+        self.openSessions = {}
+        self.lock = threading.Lock()
+
+    def getRateTable(self, size: int) -> RateTable | None:
+        return self.rateTables.get(size, self.fallback)
+
+    def canBill(self, size: int) -> bool:
+        return 0 < size <= MAX_SIZE and self.getRateTable(size) is not None
+
+    def startSession(self, driverId: int, size: int, timestamp: float) -> int:
+        with self.lock:
+            index = len(self.entries)
+            self.entries.append(timestamp)
+            self.exits.append(math.nan)
+            self.sizes.append(size)
+            self.openSessions[driverId] = index
+        return index
+
+    def startSessions(self, driverIds: list[int], sizes: list[int], timestamps: list[float]):
+        # bulk form of startSession, as when restoring open sessions after a restart
+        with self.lock:
+            index = len(self.entries)
+            self.entries.extend(timestamps)
+            self.exits.extend([math.nan] * len(timestamps))
+            self.sizes.extend(sizes)
+            self.openSessions.update(zip(driverIds, range(index, index + len(driverIds))))
+
+    def endSession(self, driverId: int, timestamp: float) -> float:
+        # the charge is worked out before the session is closed, so a failure leaves it open
+        with self.lock:
+            index = self.openSessions[driverId]
+            amount = self.getRateTable(self.sizes[index]).charge(timestamp - self.entries[index])
+            del self.openSessions[driverId]
+            self.exits[index] = timestamp
+        return amount
+
+    def getEntryTime(self, driverId: int) -> float | None:
+        with self.lock:
+            index = self.openSessions.get(driverId)
+            return None if index is None else self.entries[index]
+
+    def retireBefore(self, before: float) -> int:
+        # drops every session that ended before `before`, e.g. once its day has been billed, and
+        # compacts the arrays; open sessions are kept and renumbered. Returns how many were dropped.
+        with self.lock:
+            kept = [i for i, exit in enumerate(self.exits) if not exit < before]
+            dropped = len(self.exits) - len(kept)
+            renumbered = {index: position for position, index in enumerate(kept)}
+            self.entries = array.array("d", [self.entries[i] for i in kept])
+            self.exits = array.array("d", [self.exits[i] for i in kept])
+            self.sizes = array.array("B", [self.sizes[i] for i in kept])
+            self.openSessions = {driverId: renumbered[index] for driverId, index in self.openSessions.items()}
+            return dropped
+
+    def computeCharges(self, entries, exits, sizes):
+        # NumPy is only needed for bulk recomputation, so it is imported here
+        import numpy as np
+
+        entries = np.asarray(entries, dtype=np.float64)
+        exits = np.asarray(exits, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.intp)
+
+        tables = dict(self.rateTables)
+        if self.fallback is not None:
+            for size in range(1, int(sizes.max(initial=0)) + 1):
+                tables.setdefault(size, self.fallback)
+        tierCount = max(len(table.tiers) for table in tables.values())
+        maxSize = max(tables)
+        lowers = np.full((maxSize + 1, tierCount), np.inf)
+        uppers = np.full((maxSize + 1, tierCount), np.inf)
+        rates = np.zeros((maxSize + 1, tierCount))
+        for size, table in tables.items():
+            for tier, (lower, upper, rate) in enumerate(table.getBounds()):
+                lowers[size, tier] = lower
+                uppers[size, tier] = upper
+                rates[size, tier] = rate
+
+        hours = np.ceil((exits - entries) / SECONDS_PER_HOUR)
+        charges = np.zeros(len(hours))
+        for tier in range(tierCount):
+            lower = lowers[sizes, tier]
+            span = np.clip(np.minimum(hours, uppers[sizes, tier]) - lower, 0, None)
+            charges += np.where(np.isfinite(lower), span * rates[sizes, tier], 0.0)
+        return charges
+
+    def dailyCharges(self, dayStart: float, dayEnd: float):
+        # charges for every session that ended in [dayStart, dayEnd), in session order. The arrays
+        # are copied under the lock: a view would pin their buffers and make a concurrent
+        # startSession fail to append.
+        import numpy as np
+
+        with self.lock:
+            exits = np.array(self.exits, dtype=np.float64)
+            entries = np.array(self.entries, dtype=np.float64)
+            sizes = np.array(self.sizes, dtype=np.uint8)
+        closed = (exits >= dayStart) & (exits < dayEnd)
+        return np.flatnonzero(closed), self.computeCharges(entries[closed], exits[closed], sizes[closed])
+
+
+def defaultRateTables(rate: float) -> dict[int, RateTable]:
+    return {size: RateTable.flat(rate) for size in (1, 2, 3)}
+
+
+if __name__ == "__main__":
+    tables = {
+        1: RateTable([(2, 5.0), (6, 3.0), (24, 2.0)]),
+        2: RateTable([(2, 8.0), (6, 5.0), (24, 3.0)]),
+        3: RateTable([(1, 15.0), (24, 10.0)]),
+    }
+    engine = BillingEngine(tables)
+    rng = random.Random(0)
+    sessions = 2_000_000
+    dayStart = 1_700_000_000.0
+    for driverId in range(sessions):
+        entry = dayStart + rng.random() * 20 * SECONDS_PER_HOUR
+        engine.startSession(driverId, rng.choice((1, 1, 1, 2, 3)), entry)
+        engine.exits[driverId] = entry + rng.expovariate(1 / (3 * SECONDS_PER_HOUR))
+    engine.openSessions.clear()
+
+    start = time.perf_counter()
+    indexes, charges = engine.dailyCharges(dayStart, dayStart + 48 * SECONDS_PER_HOUR)
+    vectorTime = time.perf_counter() - start
+    print(f"vectorized: {len(charges):,} sessions in {vectorTime:.3f}s ({len(charges) / vectorTime:,.0f}/s)")
+
+    sample = 100_000
+    start = time.perf_counter()
+    scalar = [tables[engine.sizes[i]].charge(engine.exits[i] - engine.entries[i]) for i in indexes[:sample]]
+    scalarTime = time.perf_counter() - start
+    assert all(abs(a - b) < 1e-9 for a, b in zip(scalar, charges[:sample]))
+    print(f"per-session loop: {sample / scalarTime:,.0f}/s, total billed {charges.sum():,.2f}")
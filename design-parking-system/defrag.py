@@ -0,0 +1,264 @@
+import argparse
+import random
+import time
+
+from parking import ParkingFloor, ParkingGarage, ParkingSystem, FreeRunIndex, FirstFit, Vehicle
+
+
+class DefragPlan:
+    def __init__(self, windowStart: int, length: int, moves: list[tuple[Vehicle, int, int]]):
+        self.windowStart = windowStart
+        self.length = length
+        # (vehicle, fromStart, toStart); every vehicle leaves before any is parked again
+        self.moves = moves
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __str__(self):
+        moves = ", ".join(f"{start}->{target}" for _, start, target in self.moves)
+        return f"open [{self.windowStart}, {self.windowStart + self.length - 1}] by moving {len(self.moves)}: {moves}"
+
+
+def _remainingRuns(floor: ParkingFloor, windowStart: int, windowEnd: int, low: int, high: int):
+    # free runs the floor would have outside the window once the vehicles covering
+    # [low, high] have left: runs touching [low - 1, high + 1] are replaced by the
+    # merged pieces on either side of the window
+    removed = []
+    left = windowStart if windowStart > low else None
+    right = windowEnd if windowEnd < high else None
+    leftStart, rightEnd = low, high
+    for start, end in floor.freeRuns.iterRuns(low - 1):
+        if start > high + 1:
+            break
+        if end >= low - 1:
+            removed.append(end - start + 1)
+            if start < windowStart:
+                leftStart = min(leftStart, start)
+                left = windowStart
+            if end > windowEnd:
+                rightEnd = max(rightEnd, end)
+                right = windowEnd
+    added = []
+    if left is not None:
+        added.append((leftStart, windowStart - 1))
+    if right is not None:
+        added.append((windowEnd + 1, rightEnd))
+    return removed, added
+
+
+def _pack(capacities: list[int], sizes: list[int]) -> list[int] | None:
+    # Exact packing of vehicles of one to three spots into free runs of the given capacities;
+    # returns the run index for each vehicle, or None. Vehicles of one spot fit in any spare
+    # spot, so they only need the total to fit once the two- and three-spot vehicles are
+    # placed. Those are placed by a DP over runs, largest first, whose states are the counts
+    # of each size still to place. No plan needs more runs of one capacity than vehicles.
+    runs = []
+    kept = {}
+    for i, capacity in enumerate(capacities):
+        if kept.get(capacity, 0) < len(sizes):
+            kept[capacity] = kept.get(capacity, 0) + 1
+            runs.append(i)
+    if sum(sizes) > sum(capacities[i] for i in runs):
+        return None
+
+    states = {(sizes.count(2), sizes.count(3)): None}
+    layers = []
+    for i in sorted(runs, key=lambda i: -capacities[i]):
+        if (0, 0) in states or capacities[i] < 2:
+            break
+        capacity = capacities[i]
+        nextStates = {}
+        for twos, threes in states:
+            for placed3 in range(min(threes, capacity // 3) + 1):
+                for placed2 in range(min(twos, (capacity - 3 * placed3) // 2) + 1):
+                    nextStates.setdefault((twos - placed2, threes - placed3), (twos, threes, placed2, placed3))
+        layers.append((i, nextStates))
+        states = nextStates
+    if (0, 0) not in states:
+        return None
+
+    loads = {}
+    state = (0, 0)
+    for i, layer in reversed(layers):
+        twos, threes, placed2, placed3 = layer[state]
+        loads[i] = [placed2, placed3]
+        state = (twos, threes)
+    spare = {i: capacities[i] - 2 * loads.get(i, (0, 0))[0] - 3 * loads.get(i, (0, 0))[1] for i in runs}
+    targets = []
+    for size in sizes:
+        if size == 1:
+            i = next(i for i in runs if spare[i])
+            spare[i] -= 1
+        else:
+            i = next(i for i, load in loads.items() if load[size - 2])
+            loads[i][size - 2] -= 1
+        targets.append(i)
+    return targets
+
+
+def _fits(histogram: dict[int, int], sizes: list[int], removed: list[int], added: list[tuple[int, int]]) -> bool:
+    # exact packing of the displaced vehicles into the free runs left outside the window
+    counts = dict(histogram)
+    for size in removed:
+        counts[size] -= 1
+    for start, end in added:
+        counts[end - start + 1] = counts.get(end - start + 1, 0) + 1
+    capacities = []
+    for size, count in counts.items():
+        capacities.extend([size] * min(count, len(sizes)))
+    return _pack(capacities, sizes) is not None
+
+
+def planDefrag(floor: ParkingFloor, length: int) -> DefragPlan | None:
+    # Fewest relocations, then fewest spots moved, that leave `length` consecutive spots free on
+    # the floor. Vehicle intervals are disjoint, so sorted by start they are also sorted by end,
+    # and the vehicles overlapping a sliding window are a contiguous slice tracked with two
+    # pointers. Windows are tried in order of cost until the displaced vehicles pack into the
+    # floor's remaining free runs.
+    size = len(floor.spots)
+    if length > size:
+        return None
+    if floor.freeRuns.largest() >= length:
+        start = floor.freeRuns.findFit(length)
+        return DefragPlan(start, length, [])
+
+    parked = sorted(floor.vehicles.items(), key=lambda item: item[1][0])
+    vehicleStarts = [spots[0] for _, spots in parked]
+    vehicleEnds = [spots[1] for _, spots in parked]
+    movedSpots = [0]
+    for _, (start, end) in parked:
+        movedSpots.append(movedSpots[-1] + end - start + 1)
+
+    candidates = {}
+    first = last = 0
+    for windowStart in range(size - length + 1):
+        windowEnd = windowStart + length - 1
+        while first < len(parked) and vehicleEnds[first] < windowStart:
+            first += 1
+        while last < len(parked) and vehicleStarts[last] <= windowEnd:
+            last += 1
+        moved = last - first
+        candidates.setdefault(moved, []).append((movedSpots[last] - movedSpots[first], windowStart, first, last))
+
+    histogram = floor.freeRuns.getHistogram()
+    for moved in sorted(candidates):
+        for _, windowStart, first, last in sorted(candidates[moved]):
+            windowEnd = windowStart + length - 1
+            low = min(windowStart, vehicleStarts[first]) if moved else windowStart
+            high = max(windowEnd, vehicleEnds[last - 1]) if moved else windowEnd
+            sizes = [vehicleEnds[i] - vehicleStarts[i] + 1 for i in range(first, last)]
+            removed, added = _remainingRuns(floor, windowStart, windowEnd, low, high)
+            if _fits(histogram, sizes, removed, added):
+                return _assignTargets(floor, windowStart, length, parked[first:last], removed, added)
+    return None
+
+
+def _assignTargets(floor: ParkingFloor, windowStart: int, length: int, displaced: list, removed, added) -> DefragPlan:
+    windowEnd = windowStart + length - 1
+    low = min([windowStart] + [spots[0] for _, spots in displaced])
+    high = max([windowEnd] + [spots[1] for _, spots in displaced])
+    runs = [run for run in floor.freeRuns.getRuns() if run[1] < low - 1 or run[0] > high + 1]
+    runs.extend(list(run) for run in added)
+    runs.sort()
+    displaced = sorted(displaced, key=lambda item: item[1][0] - item[1][1])
+    assignment = _pack([end - start + 1 for start, end in runs], [end - start + 1 for _, (start, end) in displaced])
+    nextFree = [start for start, _ in runs]
+    moves = []
+    for (vehicle, (start, end)), i in zip(displaced, assignment):
+        moves.append((vehicle, start, nextFree[i]))
+        nextFree[i] += end - start + 1
+    return DefragPlan(windowStart, length, moves)
+
+
+def applyPlan(target: ParkingGarage | ParkingSystem, index: int, plan: DefragPlan) -> bool:
+    # apply through the ParkingSystem when there is one, so the moves reach its journal
+    moves = [(vehicle, to) for vehicle, _, to in plan.moves]
+    if isinstance(target, ParkingSystem):
+        return target.relocateVehicles(index, moves)
+    target.relocateVehicles(index, moves)
+    return True
+
+
+def bruteForce(floor: ParkingFloor, length: int) -> int | None:
+    # fewest relocations by trying every window and every way of packing its displaced vehicles
+    best = None
+    for windowStart in range(len(floor.spots) - length + 1):
+        windowEnd = windowStart + length - 1
+        displaced = [spots for spots in floor.vehicles.values() if spots[1] >= windowStart and spots[0] <= windowEnd]
+        if best is not None and len(displaced) >= best:
+            continue
+        index = FreeRunIndex(len(floor.spots))
+        index.allocate(windowStart, windowEnd)
+        for start, end in floor.vehicles.values():
+            if end < windowStart or start > windowEnd:
+                index.allocate(start, end)
+        capacities = [end - start + 1 for start, end in index.getRuns()]
+        if _packsExhaustively(capacities, sorted((end - start + 1 for start, end in displaced), reverse=True)):
+            best = len(displaced)
+    return best
+
+
+def _packsExhaustively(capacities: list[int], sizes: list[int]) -> bool:
+    # backtracking over every run with room for the next vehicle, one run per distinct capacity
+    if not sizes:
+        return True
+    tried = set()
+    for i, capacity in enumerate(capacities):
+        if capacity < sizes[0] or capacity in tried:
+            continue
+        tried.add(capacity)
+        capacities[i] -= sizes[0]
+        packs = _packsExhaustively(capacities, sizes[1:])
+        capacities[i] += sizes[0]
+        if packs:
+            return True
+    return False
+
+
+def fragmentedFloor(spots: int, load: float, seed: int) -> ParkingGarage:
+    # fill with a mix of sizes, then empty random vehicles until the floor is `load` occupied
+    rng = random.Random(seed)
+    garage = ParkingGarage(1, spots, FirstFit())
+    vehicles = []
+    while True:
+        vehicle = Vehicle(rng.choice((1, 1, 1, 2, 3)))
+        if not garage.parkVehicle(vehicle):
+            break
+        vehicles.append(vehicle)
+    rng.shuffle(vehicles)
+    floor = garage.floors[0]
+    while floor.metrics.occupied > load * spots:
+        garage.removeVehicle(vehicles.pop())
+    return garage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan relocations that open a free run on fragmented floors")
+    parser.add_argument("--spots", type=int, default=5000)
+    parser.add_argument("--load", type=float, default=0.95)
+    parser.add_argument("--floors", type=int, default=20)
+    args = parser.parse_args()
+
+    for length in (3, 6, 12):
+        times = []
+        moves = []
+        for seed in range(args.floors):
+            garage = fragmentedFloor(args.spots, args.load, seed)
+            floor = garage.floors[0]
+            start = time.perf_counter()
+            plan = planDefrag(floor, length)
+            times.append(time.perf_counter() - start)
+            if plan is None:
+                continue
+            moves.append(len(plan))
+            applyPlan(garage, 0, plan)
+            assert floor.freeRuns.largest() >= length
+            assert not any(floor.spots[spot] for spot in range(plan.windowStart, plan.windowStart + length))
+        for seed in range(args.floors):
+            floor = fragmentedFloor(300, args.load, seed).floors[0]
+            plan = planDefrag(floor, length)
+            assert (None if plan is None else len(plan)) == bruteForce(floor, length), "plan is not minimal"
+        times.sort()
+        print(f"run of {length}: median {times[len(times) // 2] * 1000:.2f}ms, max {times[-1] * 1000:.2f}ms, "
+              f"moves {min(moves)}-{max(moves)} on {args.spots:,}-spot floors at {args.load:.0%} load")
@@ -0,0 +1,185 @@
+import argparse
+import heapq
+import math
+import random
+import threading
+import time
+
+from parking import ParkingGarage, ParkingSystem, Driver, Vehicle
+
+LEAF_SIZE = 8
+
+
+class GarageFederation:
+    # Routes drivers across many garages. Garages sit in a k-d tree built once over their
+    # (x, y) positions in a planar projection (e.g. km); each node keeps its bounding box and
+    # the largest free run of any garage below it. A garage reports a change of its largest
+    # run through ParkingGarage.onCapacityChange and the new maximum is pushed up to the root
+    # in O(log garages). The nearest garage that fits k spots is a best-first search that
+    # skips subtrees that are too full or farther away than the best match so far.
+    def __init__(self, systems: list[tuple[ParkingSystem, float, float]]):
+        self.systems = [system for system, _, _ in systems]
+        self.xs = [x for _, x, _ in systems]
+        self.ys = [y for _, _, y in systems]
+        self.capacity = [system.garage.getLargestRun() for system in self.systems]
+        self.lock = threading.Lock()
+
+        self.bounds = []
+        self.maxFree = []
+        self.children = []
+        self.members = []
+        self.parent = []
+        self.leafOf = [0] * len(self.systems)
+        if self.systems:
+            self._build(list(range(len(self.systems))), -1, 0)
+        for index, system in enumerate(self.systems):
+            system.garage.onCapacityChange = self._listener(index)
+
+    def _build(self, indexes: list[int], parent: int, depth: int) -> int:
+        node = len(self.bounds)
+        xs = [self.xs[i] for i in indexes]
+        ys = [self.ys[i] for i in indexes]
+        self.bounds.append((min(xs), max(xs), min(ys), max(ys)))
+        self.maxFree.append(max(self.capacity[i] for i in indexes))
+        self.children.append(None)
+        self.members.append(None)
+        self.parent.append(parent)
+        if len(indexes) <= LEAF_SIZE:
+            self.members[node] = indexes
+            for i in indexes:
+                self.leafOf[i] = node
+            return node
+        coords = self.xs if depth % 2 == 0 else self.ys
+        indexes.sort(key=coords.__getitem__)
+        mid = len(indexes) // 2
+        left = self._build(indexes[:mid], node, depth + 1)
+        right = self._build(indexes[mid:], node, depth + 1)
+        self.children[node] = (left, right)
+        return node
+
+    def _listener(self, index: int):
+        def onCapacityChange(largestRun: int):
+            self.updateCapacity(index, largestRun)
+        return onCapacityChange
+
+    def updateCapacity(self, index: int, largestRun: int):
+        with self.lock:
+            self.capacity[index] = largestRun
+            node = self.leafOf[index]
+            value = max(self.capacity[i] for i in self.members[node])
+            while node != -1 and self.maxFree[node] != value:
+                self.maxFree[node] = value
+                node = self.parent[node]
+                if node != -1:
+                    left, right = self.children[node]
+                    value = max(self.maxFree[left], self.maxFree[right])
+
+    def _boxDistance(self, node: int, x: float, y: float) -> float:
+        minX, maxX, minY, maxY = self.bounds[node]
+        dx = minX - x if x < minX else x - maxX if x > maxX else 0.0
+        dy = minY - y if y < minY else y - maxY if y > maxY else 0.0
+        return math.hypot(dx, dy)
+
+    def findNearest(self, spotsRequired: int, x: float, y: float, exclude: set = frozenset()) -> int | None:
+        # index of the nearest garage whose largest free run fits `spotsRequired` spots
+        if not self.systems:
+            return None
+        best = None
+        bestDistance = math.inf
+        with self.lock:
+            heap = [(0.0, 0)]
+            while heap:
+                distance, node = heapq.heappop(heap)
+                if distance >= bestDistance:
+                    break
+                if self.maxFree[node] < spotsRequired:
+                    continue
+                if self.members[node] is not None:
+                    for i in self.members[node]:
+                        if self.capacity[i] >= spotsRequired and i not in exclude:
+                            candidate = math.hypot(self.xs[i] - x, self.ys[i] - y)
+                            if candidate < bestDistance:
+                                best, bestDistance = i, candidate
+                    continue
+                for child in self.children[node]:
+                    if self.maxFree[child] >= spotsRequired:
+                        childDistance = self._boxDistance(child, x, y)
+                        if childDistance < bestDistance:
+                            heapq.heappush(heap, (childDistance, child))
+        return best
+
+    def routeDriver(self, driver: Driver, x: float, y: float) -> int | None:
+        # parks the driver at the nearest garage that takes them; returns that garage's index
+        spotsRequired = driver.getVehicle().getSpotSize()
+        # a garage can still turn the driver away (reserved runs, another gate was faster)
+        tried = set()
+        while True:
+            index = self.findNearest(spotsRequired, x, y, tried)
+            if index is None:
+                return None
+            if self.systems[index].parkDriver(driver):
+                return index
+            tried.add(index)
+
+    def getSystem(self, index: int) -> ParkingSystem:
+        return self.systems[index]
+
+
+def linearNearest(federation: GarageFederation, spotsRequired: int, x: float, y: float) -> int | None:
+    # the polling approach the index replaces: ask every garage
+    best = None
+    bestDistance = math.inf
+    for i, system in enumerate(federation.systems):
+        if system.garage.getLargestRun() >= spotsRequired:
+            distance = math.hypot(federation.xs[i] - x, federation.ys[i] - y)
+            if distance < bestDistance:
+                best, bestDistance = i, distance
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Route drivers across many garages and time nearest-fit lookups")
+    parser.add_argument("--garages", type=int, default=5000)
+    parser.add_argument("--floors", type=int, default=3)
+    parser.add_argument("--spots", type=int, default=40)
+    parser.add_argument("--drivers", type=int, default=100_000)
+    parser.add_argument("--area", type=float, default=100.0, help="side of the square service area in km")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    systems = [(ParkingSystem(ParkingGarage(args.floors, args.spots), 5),
+                rng.uniform(0, args.area), rng.uniform(0, args.area)) for _ in range(args.garages)]
+    federation = GarageFederation(systems)
+
+    # drivers cluster around a few hot spots, so nearby garages fill and lookups must reach further out
+    hotSpots = [(rng.uniform(0, args.area), rng.uniform(0, args.area)) for _ in range(5)]
+    parked = []
+    lookupTime = 0.0
+    lookups = routed = 0
+    for _ in range(args.drivers):
+        if parked and rng.random() < 0.3:
+            index, driver = parked.pop(rng.randrange(len(parked)))
+            federation.getSystem(index).removeDriver(driver)
+            continue
+        hx, hy = rng.choice(hotSpots)
+        x, y = rng.gauss(hx, args.area / 20), rng.gauss(hy, args.area / 20)
+        driver = Driver(Vehicle(rng.choice((1, 1, 1, 2, 3))))
+        start = time.perf_counter()
+        index = federation.findNearest(driver.getVehicle().getSpotSize(), x, y)
+        lookupTime += time.perf_counter() - start
+        lookups += 1
+        if index is not None and federation.getSystem(index).parkDriver(driver):
+            parked.append((index, driver))
+            routed += 1
+
+    sample = 500
+    queries = [(rng.choice((1, 2, 3)), rng.uniform(0, args.area), rng.uniform(0, args.area)) for _ in range(sample)]
+    start = time.perf_counter()
+    expected = [linearNearest(federation, k, x, y) for k, x, y in queries]
+    linearTime = (time.perf_counter() - start) / sample
+    actual = [federation.findNearest(k, x, y) for k, x, y in queries]
+    assert actual == expected, "indexed lookup disagrees with a full scan"
+
+    print(f"{args.garages:,} garages, {routed:,} of {lookups:,} drivers routed")
+    print(f"indexed lookup: {lookupTime / lookups * 1e6:.1f}us, full scan: {linearTime * 1e6:.1f}us")
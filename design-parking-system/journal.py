@@ -0,0 +1,272 @@
+import argparse
+import os
+import random
+import struct
+import threading
+import time
+
+from parking import ParkingGarage, ParkingSystem, SpotBitset, Driver, Vehicle
+
+SNAPSHOT_MAGIC = b"PKSN"
+JOURNAL_MAGIC = b"PKJL"
+SNAPSHOT_HEADER = struct.Struct("<4sBIIQI")
+SNAPSHOT_ENTRY = struct.Struct("<IBIId")
+JOURNAL_HEADER = struct.Struct("<4sB")
+JOURNAL_RECORD = struct.Struct("<BQIBIId")
+PARK = 1
+REMOVE = 0
+MOVE = 2
+MOVE_END = 3
+
+
+class ParkingJournal:
+    # Every park and remove is appended to journal.bin as a fixed-size record with a sequence
+    # number. Every `snapshotEvery` records the current occupancy is written to snapshot.bin:
+    # each floor's spot bitset followed by one entry per parked vehicle. The snapshot is
+    # written to a temporary file and renamed into place, then the journal restarts empty.
+    # Recovery loads the snapshot and replays only records newer than it, so a crash between
+    # the rename and the journal reset replays nothing twice. A torn final record is dropped.
+    # A relocation is one MOVE record per vehicle closed by a MOVE_END record; replay applies
+    # the batch only once its MOVE_END is read, so a torn batch is dropped as a whole.
+    def __init__(self, directory: str, floors: int, spotsPerFloor: int,
+                 snapshotEvery: int = 10_000, sync: bool = False):
+        self.directory = directory
+        self.floors = floors
+        self.spotsPerFloor = spotsPerFloor
+        self.snapshotEvery = snapshotEvery
+        self.sync = sync
+        self.snapshotPath = os.path.join(directory, "snapshot.bin")
+        self.journalPath = os.path.join(directory, "journal.bin")
+        # driverId -> (size, floor, start, parkedAt): the state the next snapshot will hold
+        self.parked = {}
+        self.seq = 0
+        self.sinceSnapshot = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._file = None
+        # records already on disk: appending before recover() would restart seq at 1 below the
+        # snapshot's seq, and the next recovery would skip everything written since
+        self.needsRecovery = os.path.exists(self.snapshotPath) or (
+            os.path.exists(self.journalPath) and os.path.getsize(self.journalPath) > JOURNAL_HEADER.size)
+
+    def _openJournal(self, truncateAt: int = None):
+        self._file = open(self.journalPath, "r+b" if os.path.exists(self.journalPath) else "w+b")
+        if truncateAt is not None:
+            self._file.truncate(truncateAt)
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() == 0:
+            self._file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, 1))
+
+    def _append(self, kind: int, driverId: int, size: int, index: int, start: int, timestamp: float):
+        if self._file is None:
+            if self.needsRecovery:
+                raise RuntimeError(f"{self.directory} already holds a journal; call recover() before recording")
+            self._openJournal()
+        self.seq += 1
+        self._file.write(JOURNAL_RECORD.pack(kind, self.seq, driverId, size, index, start, timestamp))
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.sinceSnapshot += 1
+
+    def _snapshotIfDue(self):
+        if self.sinceSnapshot >= self.snapshotEvery:
+            self.snapshot()
+
+    def recordPark(self, driverId: int, size: int, index: int, start: int, timestamp: float):
+        with self.lock:
+            self.parked[driverId] = (size, index, start, timestamp)
+            self._append(PARK, driverId, size, index, start, timestamp)
+            self._snapshotIfDue()
+
+    def recordRemove(self, driverId: int, timestamp: float):
+        with self.lock:
+            self.parked.pop(driverId, None)
+            self._append(REMOVE, driverId, 0, 0, 0, timestamp)
+            self._snapshotIfDue()
+
+    def recordMoves(self, index: int, moves: list[tuple[int, int, int]], timestamp: float):
+        # (driverId, size, newStart) for vehicles relocated together on floor `index`;
+        # no snapshot is taken part-way through a batch
+        with self.lock:
+            for driverId, size, start in moves:
+                self.parked[driverId] = (size, index, start, self.parked[driverId][3])
+                self._append(MOVE, driverId, size, index, start, timestamp)
+            self._append(MOVE_END, 0, 0, index, len(moves), timestamp)
+            self._snapshotIfDue()
+
+    def snapshot(self):
+        # built from the journal's own view rather than the live garage, so gates mid-way
+        # through parking or removing a vehicle cannot leak half-done state into it
+        floorBits = [SpotBitset(self.spotsPerFloor) for _ in range(self.floors)]
+        entries = bytearray(SNAPSHOT_ENTRY.size * len(self.parked))
+        offset = 0
+        for driverId, (size, index, start, parkedAt) in self.parked.items():
+            floorBits[index].setRange(start, start + size - 1, 1)
+            SNAPSHOT_ENTRY.pack_into(entries, offset, driverId, size, index, start, parkedAt)
+            offset += SNAPSHOT_ENTRY.size
+
+        tempPath = self.snapshotPath + ".tmp"
+        with open(tempPath, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1, self.floors, self.spotsPerFloor,
+                                         self.seq, len(self.parked)))
+            for bits in floorBits:
+                f.write(bits.toBytes())
+            f.write(entries)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tempPath, self.snapshotPath)
+
+        if self._file is not None:
+            self._file.close()
+        self._openJournal(truncateAt=0)
+        self.sinceSnapshot = 0
+
+    def _readSnapshot(self) -> tuple[int, list[bytes], list[tuple]]:
+        if not os.path.exists(self.snapshotPath):
+            empty = bytes(SpotBitset(self.spotsPerFloor).toBytes())
+            return 0, [empty] * self.floors, []
+        with open(self.snapshotPath, "rb") as f:
+            data = f.read()
+        magic, _, floors, spotsPerFloor, seq, count = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a parking snapshot file")
+        if (floors, spotsPerFloor) != (self.floors, self.spotsPerFloor):
+            raise ValueError("Snapshot was taken for a garage of a different shape")
+        offset = SNAPSHOT_HEADER.size
+        floorBytes = (spotsPerFloor + 7) // 8
+        floorBits = []
+        for _ in range(floors):
+            floorBits.append(data[offset:offset + floorBytes])
+            offset += floorBytes
+        entries = list(SNAPSHOT_ENTRY.iter_unpack(data[offset:offset + count * SNAPSHOT_ENTRY.size]))
+        return seq, floorBits, entries
+
+    def _readJournal(self, afterSeq: int) -> tuple[list[tuple], int, int]:
+        # records newer than `afterSeq`, the offset just past the last complete record and the
+        # file length; a torn tail is everything between the two
+        if not os.path.exists(self.journalPath):
+            return [], 0, 0
+        with open(self.journalPath, "rb") as f:
+            data = f.read()
+        if len(data) < JOURNAL_HEADER.size:
+            return [], 0, len(data)
+        magic, _ = JOURNAL_HEADER.unpack_from(data, 0)
+        if magic != JOURNAL_MAGIC:
+            raise ValueError("Not a parking journal file")
+        body = len(data) - JOURNAL_HEADER.size
+        complete = JOURNAL_HEADER.size + body - body % JOURNAL_RECORD.size
+        records = [record for record in JOURNAL_RECORD.iter_unpack(data[JOURNAL_HEADER.size:complete])
+                   if record[1] > afterSeq]
+        return records, complete, len(data)
+
+    def recover(self, system: ParkingSystem) -> dict[int, Driver]:
+        # rebuilds an empty system's garage, sessions and billing; returns the parked drivers by id
+        garage = system.garage
+        if (len(garage.floors), len(garage.floors[0].spots)) != (self.floors, self.spotsPerFloor):
+            raise ValueError("Journal was written for a garage of a different shape")
+        seq, floorBits, entries = self._readSnapshot()
+        records, complete, length = self._readJournal(seq)
+
+        drivers = {}
+        placements = []
+        for driverId, size, index, start, parkedAt in entries:
+            vehicle = Vehicle(size)
+            drivers[driverId] = Driver(vehicle, driverId)
+            placements.append((vehicle, index, start))
+            self.parked[driverId] = (size, index, start, parkedAt)
+        garage.restore(floorBits, placements)
+
+        moves = []
+        for kind, recordSeq, driverId, size, index, start, timestamp in records:
+            if kind == PARK:
+                vehicle = Vehicle(size)
+                drivers[driverId] = Driver(vehicle, driverId)
+                garage.placeVehicle(vehicle, index, start)
+                self.parked[driverId] = (size, index, start, timestamp)
+            elif kind == REMOVE:
+                garage.removeVehicle(drivers.pop(driverId).getVehicle())
+                del self.parked[driverId]
+            elif kind == MOVE:
+                moves.append((driverId, start))
+                continue
+            else:
+                garage.relocateVehicles(index, [(drivers[moved].getVehicle(), target) for moved, target in moves])
+                for moved, target in moves:
+                    size, _, _, parkedAt = self.parked[moved]
+                    self.parked[moved] = (size, index, target, parkedAt)
+                moves = []
+            seq = recordSeq
+
+        # a relocation batch without its MOVE_END never happened
+        if moves:
+            complete -= len(moves) * JOURNAL_RECORD.size
+        tornAt = complete if complete < length else None
+
+        driverIds = list(self.parked)
+        sessions = self.parked.values()
+        system.timeParked.update((driverId, session[3]) for driverId, session in zip(driverIds, sessions))
+        system.driverIds.update((driver.getVehicle(), driverId) for driverId, driver in drivers.items())
+        system.billing.startSessions(driverIds, [session[0] for session in sessions],
+                                     [session[3] for session in sessions])
+
+        self.seq = seq
+        self.sinceSnapshot = len(records) - len(moves)
+        self._openJournal(truncateAt=tornAt)
+        self.needsRecovery = False
+        system.journal = self
+        return drivers
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a garage, then time recovery from its snapshot and journal")
+    parser.add_argument("directory")
+    parser.add_argument("--floors", type=int, default=100)
+    parser.add_argument("--spots", type=int, default=1000)
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument("--snapshot-every", type=int, default=10_000)
+    args = parser.parse_args()
+
+    for name in ("snapshot.bin", "journal.bin"):
+        path = os.path.join(args.directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    rng = random.Random(0)
+    journal = ParkingJournal(args.directory, args.floors, args.spots, args.snapshot_every)
+    system = ParkingSystem(ParkingGarage(args.floors, args.spots), 5, journal=journal)
+    pool = [Driver(Vehicle(rng.choice((1, 1, 1, 2, 3)))) for _ in range(args.floors * args.spots)]
+    for _ in range(args.operations):
+        driver = rng.choice(pool)
+        if rng.random() < 0.6:
+            system.parkDriver(driver)
+        else:
+            system.removeDriver(driver)
+    journal.close()
+
+    start = time.perf_counter()
+    with ParkingJournal(args.directory, args.floors, args.spots) as recovered:
+        restored = ParkingSystem(ParkingGarage(args.floors, args.spots), 5)
+        drivers = recovered.recover(restored)
+    elapsed = time.perf_counter() - start
+
+    expected = {driverId: system.garage.getVehicleLocation(driver.getVehicle())
+                for driverId, driver in ((d.getId(), d) for d in pool) if system.timeParked.get(driverId)}
+    actual = {driverId: restored.garage.getVehicleLocation(driver.getVehicle()) for driverId, driver in drivers.items()}
+    assert expected == actual, "recovered garage differs from the original"
+    for original, floor in zip(system.garage.floors, restored.garage.floors):
+        assert original.spots.toBytes() == floor.spots.toBytes()
+        assert original.freeRuns.getRuns() == floor.freeRuns.getRuns()
+    print(f"recovered {len(drivers):,} vehicles on {args.floors * args.spots:,} spots "
+          f"({len(recovered.parked):,} sessions) in {elapsed * 1000:.1f}ms")
@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+
+from parking import ParkingGarage, ConcurrentParkingGarage, ParkingSystem, Driver, Car, Limo, Semi
+from parking import FirstFit, BestFit, FillFromEnds, SizeSegregatedZones
+from simulate import ARRIVE, STAYS, generateTrace
+
+VEHICLES = {"Car": Car, "Limo": Limo, "Semi": Semi}
+POLICIES = {str(policy): policy for policy in (FirstFit(), BestFit(), FillFromEnds(), SizeSegregatedZones())}
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def percentiles(samples: list[int]) -> dict[str, float]:
+    # nanosecond samples -> microsecond percentiles by nearest rank
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    summary = {f"p{p:g}": ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)] / 1000 for p in PERCENTILES}
+    summary["max"] = ordered[-1] / 1000
+    return summary
+
+
+def replaySystem(trace: list, floors: int, spotsPerFloor: int, policy: str, concurrent: bool = False) -> dict:
+    # drives a full ParkingSystem (drivers, billing, metrics) with the trace's own clock
+    garageClass = ConcurrentParkingGarage if concurrent else ParkingGarage
+    garage = garageClass(floors, spotsPerFloor, POLICIES[policy])
+    now = [0.0]
+    system = ParkingSystem(garage, 5, clock=lambda: now[0])
+    vehicleClasses = {cls().getSpotSize(): cls for cls in VEHICLES.values()}
+    drivers = {}
+    parkNanos = []
+    removeNanos = []
+    arrivals = {name: 0 for name in VEHICLES}
+    rejected = {name: 0 for name in VEHICLES}
+
+    clock = time.perf_counter_ns
+    start = clock()
+    for timestamp, kind, vehicleId, size in trace:
+        now[0] = timestamp
+        if kind == ARRIVE:
+            vehicleClass = vehicleClasses[size]
+            driver = Driver(vehicleClass())
+            before = clock()
+            isParked = system.parkDriver(driver)
+            parkNanos.append(clock() - before)
+            arrivals[vehicleClass.__name__] += 1
+            if isParked:
+                drivers[vehicleId] = driver
+            else:
+                rejected[vehicleClass.__name__] += 1
+        elif vehicleId in drivers:
+            before = clock()
+            system.removeDriver(drivers.pop(vehicleId))
+            removeNanos.append(clock() - before)
+    elapsed = (clock() - start) / 1e9
+
+    operations = len(parkNanos) + len(removeNanos)
+    totalArrivals = sum(arrivals.values())
+    return {
+        "floors": floors,
+        "spotsPerFloor": spotsPerFloor,
+        "policy": policy,
+        "concurrent": concurrent,
+        "operations": operations,
+        "seconds": elapsed,
+        "opsPerSecond": operations / elapsed if elapsed else 0.0,
+        "rejectionRate": sum(rejected.values()) / totalArrivals if totalArrivals else 0.0,
+        "rejectionRateByVehicle": {name: rejected[name] / arrivals[name] if arrivals[name] else 0.0
+                                   for name in VEHICLES},
+        "parkLatencyMicros": percentiles(parkNanos),
+        "removeLatencyMicros": percentiles(removeNanos),
+        "finalMetrics": system.getMetrics(),
+    }
+
+
+def gitRevision() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def compare(baselinePath: str, candidatePath: str):
+    # prints per-configuration changes between two result files written by this script
+    with open(baselinePath) as f:
+        baseline = json.load(f)
+    with open(candidatePath) as f:
+        candidate = json.load(f)
+
+    def key(result):
+        return result["floors"], result["spotsPerFloor"], result["policy"], result["concurrent"]
+
+    previous = {key(result): result for result in baseline["results"]}
+    for result in candidate["results"]:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        speedup = result["opsPerSecond"] / old["opsPerSecond"] if old["opsPerSecond"] else float("nan")
+        print(f"{result['floors']}x{result['spotsPerFloor']} {result['policy']}: ops/s x{speedup:.2f}, "
+              f"park p99 {old['parkLatencyMicros'].get('p99', 0):.1f} -> "
+              f"{result['parkLatencyMicros'].get('p99', 0):.1f}us, "
+              f"rejected {old['rejectionRate']:.3%} -> {result['rejectionRate']:.3%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay generated arrival/departure traces against ParkingSystem")
+    parser.add_argument("--arrivals", type=int, default=200_000)
+    parser.add_argument("--garage", action="append", default=None,
+                        help="FLOORSxSPOTS, may be repeated (default 10x200 and 50x1000)")
+    parser.add_argument("--policy", action="append", choices=sorted(POLICIES), default=None,
+                        help="may be repeated (default FirstFit)")
+    parser.add_argument("--load", type=float, default=0.95, help="offered load as a share of total spots")
+    parser.add_argument("--stay", choices=STAYS, default="lognormal")
+    parser.add_argument("--mean-stay", type=float, default=3600.0, help="mean stay in seconds")
+    parser.add_argument("--mix", type=float, nargs=3, default=(0.7, 0.2, 0.1), metavar=("CAR", "LIMO", "SEMI"))
+    parser.add_argument("--concurrent", action="store_true", help="use ConcurrentParkingGarage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadgen-results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        raise SystemExit
+
+    sizeMix = {vehicle().getSpotSize(): share for vehicle, share in zip(VEHICLES.values(), args.mix)}
+    meanSize = sum(size * share for size, share in sizeMix.items()) / sum(sizeMix.values())
+    results = []
+    for garage in args.garage or ["10x200", "50x1000"]:
+        floors, spots = (int(part) for part in garage.lower().split("x"))
+        arrivalRate = args.load * floors * spots / (meanSize * args.mean_stay)
+        trace = generateTrace(args.arrivals, arrivalRate, args.mean_stay, sizeMix, args.seed, args.stay)
+        for policy in args.policy or ["FirstFit"]:
+            result = replaySystem(trace, floors, spots, policy, args.concurrent)
+            results.append(result)
+            park = result["parkLatencyMicros"]
+            print(f"{garage} {policy}: {result['opsPerSecond']:,.0f} ops/s, rejected {result['rejectionRate']:.3%}, "
+                  f"park p50 {park['p50']:.1f}us p99 {park['p99']:.1f}us p99.9 {park['p99.9']:.1f}us")
+
+    report = {
+        "revision": gitRevision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "workload": {
+            "arrivals": args.arrivals,
+            "load": args.load,
+            "stay": args.stay,
+            "meanStay": args.mean_stay,
+            "mix": dict(zip(VEHICLES, args.mix)),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
@@ -0,0 +1,88 @@
+import threading
+
+RUNS = 0
+VEHICLES = 1
+
+
+class OccupancyMetrics:
+    # Running counters for one level (floor, garage or system). Each park, remove, run split or
+    # run merge adjusts a handful of counters here, so reading the current state never walks
+    # spots or vehicles. A floor's changes are queued and handed to the parent level in one
+    # batch per event, which takes the parent's lock once however many runs changed.
+    def __init__(self, capacity: int = 0, parent: "OccupancyMetrics" = None):
+        self.capacity = capacity
+        self.occupied = 0
+        self.freeRuns = {}
+        self.vehiclesBySize = {}
+        self.rejectionsBySize = {}
+        self.parent = None
+        self.pending = []
+        # floors on different gates feed one garage-level instance concurrently
+        self.lock = threading.Lock()
+        if parent is not None:
+            self.attach(parent)
+
+    def attach(self, parent: "OccupancyMetrics"):
+        # carry everything counted so far into the parent, then forward future events to it
+        self.parent = parent
+        with parent.lock:
+            parent.capacity += self.capacity
+        changes = [(RUNS, size, count) for size, count in self.freeRuns.items()]
+        changes += [(VEHICLES, size, count) for size, count in self.vehiclesBySize.items()]
+        parent.apply(changes)
+
+    def changeRun(self, size: int, delta: int):
+        count = self.freeRuns.get(size, 0) + delta
+        if count:
+            self.freeRuns[size] = count
+        else:
+            del self.freeRuns[size]
+        if self.parent:
+            self.pending.append((RUNS, size, delta))
+
+    def changeVehicles(self, size: int, delta: int):
+        self.occupied += size * delta
+        count = self.vehiclesBySize.get(size, 0) + delta
+        if count:
+            self.vehiclesBySize[size] = count
+        else:
+            del self.vehiclesBySize[size]
+        if self.parent:
+            self.pending.append((VEHICLES, size, delta))
+
+    def flush(self):
+        if self.pending:
+            changes, self.pending = self.pending, []
+            self.parent.apply(changes)
+
+    def apply(self, changes: list[tuple[int, int, int]]):
+        with self.lock:
+            for kind, size, delta in changes:
+                if kind == VEHICLES:
+                    self.occupied += size * delta
+                    counts = self.vehiclesBySize
+                else:
+                    counts = self.freeRuns
+                count = counts.get(size, 0) + delta
+                if count:
+                    counts[size] = count
+                else:
+                    del counts[size]
+        if self.parent:
+            self.parent.apply(changes)
+
+    def reject(self, size: int):
+        # rejections are counted only at the level that turned the vehicle away
+        with self.lock:
+            self.rejectionsBySize[size] = self.rejectionsBySize.get(size, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "capacity": self.capacity,
+                "occupied": self.occupied,
+                "utilization": self.occupied / self.capacity if self.capacity else 0.0,
+                "freeRuns": dict(sorted(self.freeRuns.items())),
+                "vehiclesBySize": dict(sorted(self.vehiclesBySize.items())),
+                "rejectionsBySize": dict(sorted(self.rejectionsBySize.items())),
+            }
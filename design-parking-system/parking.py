@@ -1,5 +1,12 @@
-import datetime
-import math
+import array
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from billing import BillingEngine, RateTable, defaultRateTables
+from metrics import OccupancyMetrics
+from reservations import ReservationCalendar, findFreeRun, spotMask
 
 
 class Vehicle:
@@ -29,10 +36,15 @@ class Driver:
         Driver.id_count += 1
         return Driver.id_count
     
-    def __init__(self, vehicle):
+    def __init__(self, vehicle, driverId: int = None):
         self.payment_due = 0
         self.vehicle = vehicle
-        self.id = self.updateId()
+        # a known id (e.g. one restored from a journal) keeps the counter ahead of it
+        if driverId is None:
+            self.id = self.updateId()
+        else:
+            self.id = driverId
+            Driver.id_count = max(Driver.id_count, driverId)
     
     def getId(self) -> int:
         return self.id
@@ -43,87 +55,927 @@ class Driver:
     def charge(self, amount):
         self.payment_due += amount
         
+CHUNK_BITS = 4096
+# spots per leaf of FreeRunIndex's segment tree
+RUN_BLOCK = 32
+
+class SpotBitset:
+    # One bit per spot (1 = occupied) packed into a bytearray, with spot i at bit i % 8 of byte
+    # i // 8. Indexing and iteration behave like the list of 0/1 ints it replaces. Searches
+    # read CHUNK_BITS at a time as one Python int and test whole words with shifts and masks.
+    def __init__(self, size: int):
+        self.size = size
+        self.bits = bytearray((size + 7) // 8)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, spot: int) -> int:
+        if not 0 <= spot < self.size:
+            raise IndexError("spot out of range")
+        return (self.bits[spot >> 3] >> (spot & 7)) & 1
+
+    def __iter__(self):
+        for spot in range(self.size):
+            yield (self.bits[spot >> 3] >> (spot & 7)) & 1
+
+    def setRange(self, start: int, end: int, value: int):
+        # whole bytes in the middle, masked partial bytes at either end
+        first, last = start >> 3, end >> 3
+        lowMask = (0xFF << (start & 7)) & 0xFF
+        highMask = 0xFF >> (7 - (end & 7))
+        if first == last:
+            lowMask &= highMask
+        if value:
+            self.bits[first] |= lowMask
+        else:
+            self.bits[first] &= ~lowMask & 0xFF
+        if first == last:
+            return
+        self.bits[first + 1:last] = (b"\xff" if value else b"\x00") * (last - first - 1)
+        if value:
+            self.bits[last] |= highMask
+        else:
+            self.bits[last] &= ~highMask & 0xFF
+
+    def _freeBits(self, start: int, width: int) -> int:
+        # free spots in [start, start + width) as an int, bit 0 = spot `start`
+        first = start >> 3
+        last = (start + width + 7) >> 3
+        occupied = int.from_bytes(self.bits[first:last], "little") >> (start & 7)
+        return ~occupied & ((1 << width) - 1)
+
+    def findFreeRun(self, length: int, start: int = 0, blocked: int = 0) -> int | None:
+        # first spot at or after `start` that begins `length` spots free and clear of `blocked`
+        # (a mask of further spots to avoid, e.g. reservations); stops at the first chunk that fits
+        pos = start
+        while pos + length <= self.size:
+            width = min(CHUNK_BITS + length - 1, self.size - pos)
+            offset = findFreeRun(~self._freeBits(pos, width) | blocked >> pos, length, width)
+            if offset is not None:
+                return pos + offset
+            pos += CHUNK_BITS
+        return None
+
+    def nextFree(self, spot: int) -> int:
+        # lowest free spot at or after `spot`, or size when there is none; one word first, as
+        # the answer is usually close, then whole chunks
+        width = 64
+        while spot < self.size:
+            width = min(width, self.size - spot)
+            free = self._freeBits(spot, width)
+            if free:
+                return spot + (free & -free).bit_length() - 1
+            spot += width
+            width = CHUNK_BITS
+        return self.size
+
+    def nextOccupied(self, spot: int) -> int:
+        # lowest occupied spot at or after `spot`, or size when there is none
+        width = 64
+        while spot < self.size:
+            width = min(width, self.size - spot)
+            taken = self._freeBits(spot, width) ^ ((1 << width) - 1)
+            if taken:
+                return spot + (taken & -taken).bit_length() - 1
+            spot += width
+            width = CHUNK_BITS
+        return self.size
+
+    def prevOccupied(self, spot: int) -> int:
+        # highest occupied spot at or before `spot`, or -1 when there is none
+        width = 64
+        while spot >= 0:
+            width = min(width, spot + 1)
+            low = spot - width + 1
+            taken = self._freeBits(low, width) ^ ((1 << width) - 1)
+            if taken:
+                return low + taken.bit_length() - 1
+            spot = low - 1
+            width = CHUNK_BITS
+        return -1
+
+    def iterFreeRuns(self):
+        # yields [start, end] for each maximal run of free spots, in order
+        runStart = None
+        for pos in range(0, self.size, CHUNK_BITS):
+            width = min(CHUNK_BITS, self.size - pos)
+            free = self._freeBits(pos, width)
+            offset = 0
+            while offset < width:
+                if runStart is None:
+                    if not free:
+                        break
+                    skip = (free & -free).bit_length() - 1
+                    offset += skip
+                    free >>= skip
+                    runStart = pos + offset
+                taken = ~free
+                ones = (taken & -taken).bit_length() - 1
+                if offset + ones >= width:
+                    break
+                offset += ones
+                free >>= ones
+                yield [runStart, pos + offset - 1]
+                runStart = None
+        if runStart is not None:
+            yield [runStart, self.size - 1]
+
+    def toBytes(self) -> bytes:
+        return bytes(self.bits)
+
+    def toInt(self) -> int:
+        return int.from_bytes(self.bits, "little")
+
+    @classmethod
+    def fromBytes(cls, size: int, data: bytes) -> "SpotBitset":
+        bitset = cls(size)
+        bitset.bits[:] = data
+        return bitset
+
+class FreeRunIndex:
+    # Free runs of a floor read straight from its SpotBitset: a run starts at a free spot whose
+    # left neighbour is taken and ends before the next taken spot, both found a word at a time.
+    # A max segment tree over blocks of RUN_BLOCK spots holds the longest run starting in each
+    # block, so the lowest or highest run that fits a vehicle is one O(log n) descent plus a
+    # scan of one block. Run counts by length give the histogram and the best-fit length.
+    def __init__(self, size: int, metrics: OccupancyMetrics = None):
+        self.bits = SpotBitset(size)
+        self.counts = {}
+        self.sizes = []
+        self.metrics = metrics
+        self._allocateTree(size)
+        if size > 0:
+            self._countRun(size, 1)
+            self._setBlock(0, size)
+
+    def _allocateTree(self, size: int):
+        self.size = size
+        self.blocks = max((size + RUN_BLOCK - 1) // RUN_BLOCK, 1)
+        self.treeSize = 1
+        while self.treeSize < self.blocks:
+            self.treeSize *= 2
+        self.longest = array.array("I", [0]) * (2 * self.treeSize)
+
+    @classmethod
+    def fromBits(cls, bits: SpotBitset, metrics: OccupancyMetrics = None) -> "FreeRunIndex":
+        # bulk build over an existing bitset: fill the leaves, then every internal node once
+        index = cls(0)
+        index.bits = bits
+        index._allocateTree(len(bits))
+        tree = index.longest
+        for start, end in bits.iterFreeRuns():
+            index.counts[end - start + 1] = index.counts.get(end - start + 1, 0) + 1
+            leaf = index.treeSize + start // RUN_BLOCK
+            tree[leaf] = max(tree[leaf], end - start + 1)
+        for pos in range(index.treeSize - 1, 0, -1):
+            tree[pos] = max(tree[2 * pos], tree[2 * pos + 1])
+        index.sizes = sorted(index.counts)
+        index.metrics = metrics
+        if metrics:
+            for runSize, count in index.counts.items():
+                metrics.changeRun(runSize, count)
+        return index
+
+    @classmethod
+    def fromRuns(cls, size: int, runs, metrics: OccupancyMetrics = None) -> "FreeRunIndex":
+        bits = SpotBitset(size)
+        if size > 0:
+            bits.setRange(0, size - 1, 1)
+        for start, end in runs:
+            bits.setRange(start, end, 0)
+        return cls.fromBits(bits, metrics)
+
+    def _setBlock(self, block: int, value: int):
+        tree = self.longest
+        pos = self.treeSize + block
+        tree[pos] = value
+        pos //= 2
+        while pos:
+            left, right = tree[2 * pos], tree[2 * pos + 1]
+            value = left if left > right else right
+            if tree[pos] == value:
+                break
+            tree[pos] = value
+            pos //= 2
+
+    def _blockRuns(self, block: int) -> list[tuple[int, int]]:
+        # (start, length) of each run starting in the block, lowest first
+        bits = self.bits
+        base = block * RUN_BLOCK
+        width = min(RUN_BLOCK, self.size - base)
+        if base:
+            free = bits._freeBits(base - 1, width + 1)
+            starts = (free & ~(free << 1)) >> 1
+            free >>= 1
+        else:
+            free = bits._freeBits(0, width)
+            starts = free & ~(free << 1)
+        runs = []
+        while starts:
+            offset = (starts & -starts).bit_length() - 1
+            run = free >> offset
+            ones = ((run + 1) & ~run).bit_length() - 1
+            if offset + ones < width:
+                runs.append((base + offset, ones))
+            else:
+                runs.append((base + offset, bits.nextOccupied(base + width) - base - offset))
+            starts &= starts - 1
+        return runs
+
+    def _blockLongest(self, block: int) -> int:
+        return max((length for _, length in self._blockRuns(block)), default=0)
+
+    def _firstBlock(self, size: int, first: int) -> int | None:
+        # lowest block at or after `first` where a run of at least `size` starts: climb until a
+        # right sibling fits, then descend to its leftmost leaf that fits
+        tree = self.longest
+        if first >= self.blocks:
+            return None
+        pos = self.treeSize + first
+        if tree[pos] < size:
+            while pos > 1:
+                if not pos & 1 and tree[pos + 1] >= size:
+                    pos += 1
+                    break
+                pos //= 2
+            else:
+                return None
+            while pos < self.treeSize:
+                pos = 2 * pos if tree[2 * pos] >= size else 2 * pos + 1
+        return pos - self.treeSize
+
+    def _lastBlock(self, size: int, last: int) -> int | None:
+        # highest block at or before `last` where a run of at least `size` starts
+        tree = self.longest
+        if last < 0:
+            return None
+        pos = self.treeSize + last
+        if tree[pos] < size:
+            while pos > 1:
+                if pos & 1 and tree[pos - 1] >= size:
+                    pos -= 1
+                    break
+                pos //= 2
+            else:
+                return None
+            while pos < self.treeSize:
+                pos = 2 * pos + 1 if tree[2 * pos + 1] >= size else 2 * pos
+        return pos - self.treeSize
+
+    def _firstStart(self, size: int, spot: int) -> int | None:
+        # lowest start at or after `spot` of a run of at least `size` spots
+        block = self._firstBlock(size, spot // RUN_BLOCK)
+        while block is not None:
+            for start, length in self._blockRuns(block):
+                if length >= size and start >= spot:
+                    return start
+            block = self._firstBlock(size, block + 1)
+        return None
+
+    def _lastStart(self, size: int, spot: int) -> int | None:
+        # highest start at or before `spot` of a run of at least `size` spots
+        block = self._lastBlock(size, spot // RUN_BLOCK)
+        while block is not None:
+            for start, length in reversed(self._blockRuns(block)):
+                if length >= size and start <= spot:
+                    return start
+            block = self._lastBlock(size, block - 1)
+        return None
+
+    def _countRun(self, size: int, delta: int):
+        count = self.counts.get(size, 0) + delta
+        if count:
+            if size not in self.counts:
+                bisect.insort(self.sizes, size)
+            self.counts[size] = count
+        else:
+            del self.counts[size]
+            del self.sizes[bisect.bisect_left(self.sizes, size)]
+        if self.metrics:
+            self.metrics.changeRun(size, delta)
+
+    def findFit(self, size: int) -> int | None:
+        # lowest run of the smallest length that fits, passing over any longer runs before it
+        i = bisect.bisect_left(self.sizes, size)
+        if i == len(self.sizes):
+            return None
+        for start, end in self.iterFits(self.sizes[i]):
+            if end - start + 1 == self.sizes[i]:
+                return start
+        return None
+
+    def findFirstFit(self, size: int) -> int | None:
+        return self._firstStart(size, 0)
+
+    def findLastFit(self, size: int) -> int | None:
+        return self._lastStart(size, self.size - 1) if self.size else None
+
+    def findFitInRange(self, size: int, low: int, high: int) -> int | None:
+        # lowest start in [low, high] of a free stretch of `size` spots that stays inside the range
+        for runStart, runEnd in self.iterRuns(low):
+            if runStart > high:
+                break
+            start = max(runStart, low)
+            end = min(runEnd, high)
+            if end - start + 1 >= size:
+                return start
+        return None
+
+    def iterRuns(self, spot: int = 0):
+        # yields (start, end) of each run that ends at or after `spot`, lowest start first
+        bits = self.bits
+        spot = max(spot, 0)
+        start = bits.nextFree(spot)
+        if start == spot and spot > 0:
+            start = bits.prevOccupied(spot) + 1
+        while start < self.size:
+            end = bits.nextOccupied(start) - 1
+            yield start, end
+            start = bits.nextFree(end + 1)
+
+    def iterFits(self, size: int):
+        # yields (start, end) of every run of at least `size` spots, lowest start first
+        start = self._firstStart(size, 0)
+        while start is not None:
+            end = self.bits.nextOccupied(start) - 1
+            yield start, end
+            start = self._firstStart(size, end + 1) if end + 1 < self.size else None
+
+    def getRunEnd(self, start: int) -> int:
+        return self.bits.nextOccupied(start) - 1
+
+    def _taken(self, spot: int) -> int:
+        return (self.bits.bits[spot >> 3] >> (spot & 7)) & 1
+
+    def allocate(self, start: int, end: int):
+        # marks [start, end] occupied; the spots must be free
+        bits = self.bits
+        runStart = start if start == 0 or self._taken(start - 1) else bits.prevOccupied(start - 1) + 1
+        runEnd = bits.nextOccupied(end + 1) - 1 if end + 1 < self.size else end
+        bits.setRange(start, end, 1)
+        self._countRun(runEnd - runStart + 1, -1)
+        if runStart < start:
+            self._countRun(start - runStart, 1)
+        if end < runEnd:
+            self._countRun(runEnd - end, 1)
+        block = runStart // RUN_BLOCK
+        if runEnd - runStart + 1 == self.longest[self.treeSize + block]:
+            self._setBlock(block, self._blockLongest(block))
+        block = (end + 1) // RUN_BLOCK
+        if end < runEnd and runEnd - end > self.longest[self.treeSize + block]:
+            self._setBlock(block, runEnd - end)
+
+    def release(self, start: int, end: int):
+        # marks [start, end] free, merging with the runs either side
+        bits = self.bits
+        runStart = start if start == 0 or self._taken(start - 1) else bits.prevOccupied(start - 1) + 1
+        runEnd = end if end + 1 == self.size or self._taken(end + 1) else bits.nextOccupied(end + 1) - 1
+        bits.setRange(start, end, 0)
+        if runStart < start:
+            self._countRun(start - runStart, -1)
+        if end < runEnd:
+            self._countRun(runEnd - end, -1)
+            block = (end + 1) // RUN_BLOCK
+            if runEnd - end == self.longest[self.treeSize + block]:
+                self._setBlock(block, self._blockLongest(block))
+        self._countRun(runEnd - runStart + 1, 1)
+        block = runStart // RUN_BLOCK
+        if runEnd - runStart + 1 > self.longest[self.treeSize + block]:
+            self._setBlock(block, runEnd - runStart + 1)
+
+    def largest(self) -> int:
+        return self.sizes[-1] if self.sizes else 0
+
+    def getRuns(self) -> list[list[int]]:
+        return list(self.bits.iterFreeRuns())
+
+    def getFreeSpots(self) -> int:
+        return sum(size * count for size, count in self.counts.items())
+
+    def getHistogram(self) -> dict[int, int]:
+        return {size: self.counts[size] for size in self.sizes}
+
+class PlacementPolicy(ABC):
+    # picks the first spot for a vehicle on a floor; the floor then allocates the run
+    @abstractmethod
+    def chooseStart(self, freeRuns: FreeRunIndex, spotsRequired: int, floorSize: int) -> int | None:
+        pass
+
+class FirstFit(PlacementPolicy):
+    def chooseStart(self, freeRuns: FreeRunIndex, spotsRequired: int, floorSize: int) -> int | None:
+        return freeRuns.findFirstFit(spotsRequired)
+
+    def __str__(self):
+        return "FirstFit"
+
+class BestFit(PlacementPolicy):
+    def chooseStart(self, freeRuns: FreeRunIndex, spotsRequired: int, floorSize: int) -> int | None:
+        return freeRuns.findFit(spotsRequired)
+
+    def __str__(self):
+        return "BestFit"
+
+class FillFromEnds(PlacementPolicy):
+    # cars fill from the low end of the floor and larger vehicles from the high end
+    def chooseStart(self, freeRuns: FreeRunIndex, spotsRequired: int, floorSize: int) -> int | None:
+        if spotsRequired == 1:
+            return freeRuns.findFirstFit(spotsRequired)
+        start = freeRuns.findLastFit(spotsRequired)
+        if start is None:
+            return None
+        return freeRuns.getRunEnd(start) - spotsRequired + 1
+
+    def __str__(self):
+        return "FillFromEnds"
+
+class SizeSegregatedZones(PlacementPolicy):
+    # each vehicle size gets a share of the floor; a full zone falls back to best fit anywhere
+    def __init__(self, shares: dict[int, float] = None):
+        self.shares = shares or {1: 0.5, 2: 0.25, 3: 0.25}
+
+    def getZone(self, spotsRequired: int, floorSize: int) -> tuple[int, int]:
+        low = 0
+        for size in sorted(self.shares):
+            high = low + int(self.shares[size] * floorSize)
+            if size == spotsRequired:
+                return low, high - 1
+            low = high
+        return 0, floorSize - 1
+
+    def chooseStart(self, freeRuns: FreeRunIndex, spotsRequired: int, floorSize: int) -> int | None:
+        low, high = self.getZone(spotsRequired, floorSize)
+        start = freeRuns.findFitInRange(spotsRequired, low, high)
+        if start is None:
+            start = freeRuns.findFit(spotsRequired)
+        return start
+
+    def __str__(self):
+        return "SizeSegregatedZones"
+
 class ParkingFloor:
-    def __init__(self, spots):
+    def __init__(self, spots, policy: PlacementPolicy = None, walkInHorizon: float = 4 * 3600,
+                 parentMetrics: OccupancyMetrics = None):
         self.available = spots
-        self.spots = [0] * self.available
         self.vehicles = {}
+        self.metrics = OccupancyMetrics(spots, parentMetrics)
+        self.freeRuns = FreeRunIndex(spots, self.metrics)
+        # the index reads runs from this bitset and sets its bits in allocate and release
+        self.spots = self.freeRuns.bits
+        self.metrics.flush()
+        self.policy = policy or FirstFit()
+        self.lock = threading.Lock()
+        # walk-ins stay clear of spots reserved at any time within this many seconds
+        self.walkInHorizon = walkInHorizon
+        self.reservations = None
     
     def getParkingSpots(self):
         return self.spots
     
-    def addVehicle(self, vehicle: Vehicle) -> bool:
+    def addVehicle(self, vehicle: Vehicle, now: float = None) -> bool:
         spotsRequired = vehicle.getSpotSize()
         
-        start = 0
-        for end in range(len(self.spots)):
-            if self.spots[end] != 0:
-                start = end + 1
-            
-            if end - start + 1 == spotsRequired:
-                self.vehicles[vehicle] = [start, end]
-                for i in range(start, end + 1):
-                    self.spots[i] = 1
-                return True
-            
-        return False
+        if self.reservations and self.reservations.reservations:
+            now = time.time() if now is None else now
+            reserved = self.reservations.query(now, now + self.walkInHorizon)
+        else:
+            reserved = 0
+        
+        start = self.policy.chooseStart(self.freeRuns, spotsRequired, len(self.spots))
+        if start is not None and reserved >> start & ((1 << spotsRequired) - 1):
+            start = self._findUnreserved(spotsRequired, reserved)
+        if start is None:
+            self.metrics.reject(spotsRequired)
+            return False
+        
+        self.placeVehicle(vehicle, start, start + spotsRequired - 1)
+        return True
+    
+    def _findUnreserved(self, spotsRequired: int, reserved: int) -> int | None:
+        # the policy's pick overlaps a reservation: lowest stretch of free runs that avoids them
+        for runStart, runEnd in self.freeRuns.iterFits(spotsRequired):
+            runLength = runEnd - runStart + 1
+            offset = findFreeRun(reserved >> runStart & ((1 << runLength) - 1), spotsRequired, runLength)
+            if offset is not None:
+                return runStart + offset
+        return None
+    
+    def placeVehicle(self, vehicle: Vehicle, start: int, end: int):
+        self.freeRuns.allocate(start, end)
+        self.vehicles[vehicle] = [start, end]
+        self.metrics.changeVehicles(vehicle.getSpotSize(), 1)
+        self.metrics.flush()
     
     def removeVehicle(self, vehicle: Vehicle):
         start, end = self.vehicles[vehicle]
         del self.vehicles[vehicle]
         
-        for i in range(start, end + 1):
-            self.spots[i] = 0
+        self.freeRuns.release(start, end)
+        self.metrics.changeVehicles(vehicle.getSpotSize(), -1)
+        self.metrics.flush()
         
     def getVehicleSpots(self, vehicle: Vehicle):
         return self.vehicles[vehicle] if vehicle in self.vehicles else None
     
+    def restore(self, bits: bytes, vehicles: dict):
+        # reload occupancy from a snapshot; `vehicles` must match the occupied bits
+        for size, count in self.freeRuns.getHistogram().items():
+            self.metrics.changeRun(size, -count)
+        for size, count in self._countBySize(self.vehicles).items():
+            self.metrics.changeVehicles(size, -count)
+        self.freeRuns = FreeRunIndex.fromBits(SpotBitset.fromBytes(len(self.spots), bits), self.metrics)
+        self.spots = self.freeRuns.bits
+        self.vehicles = vehicles
+        for size, count in self._countBySize(vehicles).items():
+            self.metrics.changeVehicles(size, count)
+        self.metrics.flush()
+    
+    def _countBySize(self, vehicles: dict) -> dict[int, int]:
+        counts = {}
+        for vehicle in vehicles:
+            counts[vehicle.getSpotSize()] = counts.get(vehicle.getSpotSize(), 0) + 1
+        return counts
+    
+    def getMetrics(self) -> dict:
+        return self.metrics.snapshot()
+    
+    def reserve(self, spotsRequired: int, startTime: float, endTime: float, now: float = None) -> int | None:
+        now = time.time() if now is None else now
+        if self.reservations is None:
+            self.reservations = ReservationCalendar(len(self.spots), origin=now)
+        self.reservations.expire(now)
+        # prefer spots that are free now as well as in the calendar: a walk-in's stay has no end
+        start = self.spots.findFreeRun(spotsRequired, blocked=self.reservations.query(startTime, endTime))
+        if start is None and startTime > now + self.walkInHorizon:
+            # vehicles parked now may well have left by then; claimReservation moves the hold if not
+            start = self.reservations.findRun(spotsRequired, startTime, endTime)
+        if start is None:
+            return None
+        return self.reservations.add(start, start + spotsRequired - 1, startTime, endTime)
+    
+    def cancelReservation(self, reservationId: int):
+        self.reservations.remove(reservationId)
+    
+    def claimReservation(self, reservationId: int, vehicle: Vehicle, now: float = None) -> bool:
+        reservation = self.reservations.get(reservationId) if self.reservations else None
+        if reservation is None:
+            return False
+        start, end, _, endTime = reservation
+        if any(self.spots[spot] for spot in range(start, end + 1)):
+            # the held run is still occupied: move to a free run no other reservation needs
+            # while this vehicle stays, as a walk-in would be
+            now = time.time() if now is None else now
+            blocked = self.reservations.query(now, max(endTime, now + self.walkInHorizon)) & ~spotMask(start, end)
+            start = self.spots.findFreeRun(end - start + 1, blocked=blocked)
+            if start is None:
+                return False
+            end = start + reservation[1] - reservation[0]
+        self.reservations.remove(reservationId)
+        self.placeVehicle(vehicle, start, end)
+        return True
+    
 class ParkingGarage:
-    def __init__(self, floors:int, spotsPerFloor ):
-        self.floors = [ParkingFloor(spotsPerFloor) for _ in range(floors)]
+    def __init__(self, floors:int, spotsPerFloor, policy: PlacementPolicy = None):
+        self._policy = policy or FirstFit()
+        self.metrics = OccupancyMetrics()
+        self.floors = [ParkingFloor(spotsPerFloor, self._policy, parentMetrics=self.metrics) for _ in range(floors)]
+        self.locations = {}
+        # max segment tree over each floor's largest free run, floors as leaves
+        self.treeSize = 1
+        while self.treeSize < len(self.floors):
+            self.treeSize *= 2
+        self.largestRun = [0] * (2 * self.treeSize)
+        # called with the new largest free run whenever it changes, e.g. by a federation index
+        self.onCapacityChange = None
+        for index in range(len(self.floors)):
+            self._updateFloor(index)
+    
+    @property
+    def policy(self) -> PlacementPolicy:
+        return self._policy
     
-    def parkVehicle(self, vehicle: Vehicle) -> bool:
+    @policy.setter
+    def policy(self, policy: PlacementPolicy):
+        self._policy = policy
         for floor in self.floors:
-            added = floor.addVehicle(vehicle)
-            if added == True:
-                return True
-        return False
+            floor.policy = policy
+    
+    def _updateFloor(self, index: int):
+        tree = self.largestRun
+        pos = self.treeSize + index
+        tree[pos] = self.floors[index].freeRuns.largest()
+        pos //= 2
+        while pos:
+            left, right = tree[2 * pos], tree[2 * pos + 1]
+            value = left if left > right else right
+            if tree[pos] == value:
+                break
+            tree[pos] = value
+            pos //= 2
+        if pos == 0 and self.onCapacityChange:
+            self.onCapacityChange(tree[1])
+    
+    def _findFloor(self, spotsRequired: int, first: int = 0) -> int | None:
+        # lowest floor at or above `first` whose largest free run fits the vehicle
+        if first == 0:
+            if self.largestRun[1] < spotsRequired:
+                return None
+            pos = 1
+            while pos < self.treeSize:
+                pos = 2 * pos if self.largestRun[2 * pos] >= spotsRequired else 2 * pos + 1
+            return pos - self.treeSize
+        return self._findFloorFrom(1, 0, self.treeSize - 1, spotsRequired, first)
+    
+    def _findFloorFrom(self, pos: int, low: int, high: int, spotsRequired: int, first: int) -> int | None:
+        if high < first or self.largestRun[pos] < spotsRequired:
+            return None
+        if low == high:
+            return low
+        mid = (low + high) // 2
+        index = self._findFloorFrom(2 * pos, low, mid, spotsRequired, first)
+        if index is None:
+            index = self._findFloorFrom(2 * pos + 1, mid + 1, high, spotsRequired, first)
+        return index
+    
+    def parkVehicle(self, vehicle: Vehicle, now: float = None) -> bool:
+        spotsRequired = vehicle.getSpotSize()
+        index = self._findFloor(spotsRequired)
+        # a floor can still turn a walk-in away when its free runs are reserved; try the next one
+        while index is not None and not self.floors[index].addVehicle(vehicle, now):
+            index = self._findFloor(spotsRequired, index + 1)
+        if index is None:
+            self.metrics.reject(spotsRequired)
+            return False
+        start, end = self.floors[index].getVehicleSpots(vehicle)
+        self.locations[vehicle] = (index, start, end)
+        self._updateFloor(index)
+        return True
+    
+    def reserve(self, spotsRequired: int, startTime: float, endTime: float,
+                now: float = None) -> tuple[int, int] | None:
+        for index, floor in enumerate(self.floors):
+            try:
+                reservationId = floor.reserve(spotsRequired, startTime, endTime, now)
+            except ValueError:
+                # beyond the reservation horizon, which every floor shares
+                return None
+            if reservationId is not None:
+                return index, reservationId
+        return None
+    
+    def cancelReservation(self, reservation: tuple[int, int]):
+        index, reservationId = reservation
+        self.floors[index].cancelReservation(reservationId)
+    
+    def parkReserved(self, vehicle: Vehicle, reservation: tuple[int, int], now: float = None) -> bool:
+        index, reservationId = reservation
+        floor = self.floors[index]
+        if not floor.claimReservation(reservationId, vehicle, now):
+            return False
+        start, end = floor.getVehicleSpots(vehicle)
+        self.locations[vehicle] = (index, start, end)
+        self._updateFloor(index)
+        return True
+    
+    def placeVehicle(self, vehicle: Vehicle, index: int, start: int):
+        # park at a known location, as when replaying a journal
+        end = start + vehicle.getSpotSize() - 1
+        self.floors[index].placeVehicle(vehicle, start, end)
+        self.locations[vehicle] = (index, start, end)
+        self._updateFloor(index)
+    
+    def restore(self, floorBits: list[bytes], placements: list[tuple[Vehicle, int, int]]):
+        floorVehicles = [{} for _ in self.floors]
+        self.locations = {}
+        for vehicle, index, start in placements:
+            end = start + vehicle.getSpotSize() - 1
+            floorVehicles[index][vehicle] = [start, end]
+            self.locations[vehicle] = (index, start, end)
+        for index, floor in enumerate(self.floors):
+            floor.restore(floorBits[index], floorVehicles[index])
+            self._updateFloor(index)
     
     def removeVehicle(self, vehicle: Vehicle):
-        for floor in self.floors:
-            hasVehicle = floor.getVehicleSpots(vehicle=vehicle)
-            if hasVehicle:
-                floor.removeVehicle(vehicle=vehicle)
-                return True
-        
-        return False
+        location = self.locations.pop(vehicle, None)
+        if location is None:
+            return False
+        index = location[0]
+        self.floors[index].removeVehicle(vehicle=vehicle)
+        self._updateFloor(index)
+        return True
+    
+    def relocateVehicles(self, index: int, moves: list[tuple[Vehicle, int]]):
+        # moves vehicles to new starts on the same floor; all leave before any is parked again
+        self._relocate(index, moves)
+        self._updateFloor(index)
+    
+    def _relocate(self, index: int, moves: list[tuple[Vehicle, int]]):
+        floor = self.floors[index]
+        for vehicle, _ in moves:
+            floor.removeVehicle(vehicle)
+        for vehicle, start in moves:
+            end = start + vehicle.getSpotSize() - 1
+            floor.placeVehicle(vehicle, start, end)
+            self.locations[vehicle] = (index, start, end)
+    
+    def getVehicleLocation(self, vehicle: Vehicle) -> tuple[int, int, int] | None:
+        return self.locations.get(vehicle)
+    
+    def getLargestRun(self) -> int:
+        return self.largestRun[1]
+    
+    def getMetrics(self, perFloor: bool = False) -> dict:
+        metrics = self.metrics.snapshot()
+        if perFloor:
+            metrics["floors"] = [floor.getMetrics() for floor in self.floors]
+        return metrics
+
+class ConcurrentParkingGarage(ParkingGarage):
+    # For several gates sharing one garage. A gate picks a floor from the capacity tree, then
+    # reserves spots under that floor's lock and commits the location and tree update before
+    # releasing it. If another gate took the space in between, the reservation fails and the
+    # gate retries against the updated tree. Gates on different floors only share the brief
+    # summary lock around the tree and location map.
+    def __init__(self, floors:int, spotsPerFloor, policy: PlacementPolicy = None):
+        super().__init__(floors, spotsPerFloor, policy)
+        self.summaryLock = threading.Lock()
+    
+    def parkVehicle(self, vehicle: Vehicle, now: float = None) -> bool:
+        spotsRequired = vehicle.getSpotSize()
+        first = 0
+        while True:
+            with self.summaryLock:
+                index = self._findFloor(spotsRequired, first)
+            if index is None:
+                self.metrics.reject(spotsRequired)
+                return False
+            floor = self.floors[index]
+            with floor.lock:
+                if not floor.addVehicle(vehicle, now):
+                    # lost a race for the space: retry; otherwise the free runs are reserved
+                    first = first if floor.freeRuns.largest() < spotsRequired else index + 1
+                    continue
+                start, end = floor.getVehicleSpots(vehicle)
+                with self.summaryLock:
+                    self.locations[vehicle] = (index, start, end)
+                    self._updateFloor(index)
+            return True
+    
+    def removeVehicle(self, vehicle: Vehicle):
+        with self.summaryLock:
+            location = self.locations.pop(vehicle, None)
+        if location is None:
+            return False
+        index = location[0]
+        floor = self.floors[index]
+        with floor.lock:
+            floor.removeVehicle(vehicle=vehicle)
+            with self.summaryLock:
+                self._updateFloor(index)
+        return True
+    
+    def relocateVehicles(self, index: int, moves: list[tuple[Vehicle, int]]):
+        with self.floors[index].lock:
+            with self.summaryLock:
+                self._relocate(index, moves)
+                self._updateFloor(index)
+    
+    def reserve(self, spotsRequired: int, startTime: float, endTime: float,
+                now: float = None) -> tuple[int, int] | None:
+        # the calendar is read by walk-ins under the floor lock, so it only changes under it too
+        for index, floor in enumerate(self.floors):
+            with floor.lock:
+                try:
+                    reservationId = floor.reserve(spotsRequired, startTime, endTime, now)
+                except ValueError:
+                    return None
+            if reservationId is not None:
+                return index, reservationId
+        return None
+    
+    def cancelReservation(self, reservation: tuple[int, int]):
+        index, reservationId = reservation
+        with self.floors[index].lock:
+            self.floors[index].cancelReservation(reservationId)
+    
+    def parkReserved(self, vehicle: Vehicle, reservation: tuple[int, int], now: float = None) -> bool:
+        index, reservationId = reservation
+        floor = self.floors[index]
+        with floor.lock:
+            if not floor.claimReservation(reservationId, vehicle, now):
+                return False
+            start, end = floor.getVehicleSpots(vehicle)
+            with self.summaryLock:
+                self.locations[vehicle] = (index, start, end)
+                self._updateFloor(index)
+        return True
 
 class ParkingSystem:
-    def __init__(self, garage: ParkingGarage, rate:int):
+    def __init__(self, garage: ParkingGarage, rate:int, billing: BillingEngine = None, clock=time.time,
+                 journal=None):
         self.garage = garage
         self.rate = rate
+        # like the original flat rate, any vehicle size is billed; unlisted sizes pay `rate`
+        self.billing = billing or BillingEngine(defaultRateTables(rate), RateTable.flat(rate))
+        self.clock = clock
+        self.journal = journal
         self.timeParked = {}
+        # vehicle -> driverId for every driver whose parking has been committed
+        self.driverIds = {}
+        self.lock = threading.Lock()
+        self.metrics = OccupancyMetrics()
+        garage.metrics.attach(self.metrics)
     
     def parkDriver(self, driver: Driver):
-        currHour = datetime.datetime.now().hour
-        isParked = self.garage.parkVehicle(vehicle=driver.getVehicle())
-        if isParked:
-            self.timeParked[driver.getId()] = currHour
+        driverId = driver.getId()
+        # a vehicle the billing engine has no rate for could never be charged on leaving
+        if not self.billing.canBill(driver.getVehicle().getSpotSize()):
+            return False
+        # hold the driver's entry while parking so two gates cannot park the same driver
+        with self.lock:
+            # already parked: not a capacity rejection, so it is not counted as one
+            if driverId in self.timeParked:
+                return False
+            self.timeParked[driverId] = None
+        
+        vehicle = driver.getVehicle()
+        isParked = self.garage.parkVehicle(vehicle=vehicle, now=self.clock())
+        self._commitPark(driverId, vehicle, isParked)
+        if not isParked:
+            self.metrics.reject(vehicle.getSpotSize())
+        return isParked
+    
+    def _commitPark(self, driverId: int, vehicle: Vehicle, isParked: bool):
+        # starts billing and journals a vehicle the garage has placed, or frees the held entry
+        with self.lock:
+            if isParked:
+                parkedAt = self.clock()
+                self.timeParked[driverId] = parkedAt
+                self.driverIds[vehicle] = driverId
+                self.billing.startSession(driverId, vehicle.getSpotSize(), parkedAt)
+                if self.journal:
+                    index, start, _ = self.garage.getVehicleLocation(vehicle)
+                    self.journal.recordPark(driverId, vehicle.getSpotSize(), index, start, parkedAt)
+            else:
+                del self.timeParked[driverId]
+    
+    def reserve(self, spotsRequired: int, startTime: float, endTime: float) -> tuple[int, int] | None:
+        # (floor, reservationId) of spots held for [startTime, endTime), or None if none are free
+        return self.garage.reserve(spotsRequired, startTime, endTime, now=self.clock())
+    
+    def cancelReservation(self, reservation: tuple[int, int]):
+        self.garage.cancelReservation(reservation)
+    
+    def parkReserved(self, driver: Driver, reservation: tuple[int, int]) -> bool:
+        # parks the driver in their reserved spots and bills and journals them like a walk-in
+        driverId = driver.getId()
+        if not self.billing.canBill(driver.getVehicle().getSpotSize()):
+            return False
+        with self.lock:
+            if driverId in self.timeParked:
+                return False
+            self.timeParked[driverId] = None
+        
+        vehicle = driver.getVehicle()
+        isParked = self.garage.parkReserved(vehicle, reservation, now=self.clock())
+        self._commitPark(driverId, vehicle, isParked)
         return isParked
     
     def removeDriver(self, driver: Driver):
         driverId = driver.getId()
         
-        if driverId not in self.timeParked:
-            return False
+        # the entry stays held until the vehicle is out of the garage so the driver cannot re-park meanwhile
+        with self.lock:
+            if self.timeParked.get(driverId) is None:
+                return False
+            # charged first: if billing fails, the driver is still parked as before
+            removedAt = self.clock()
+            amount = self.billing.endSession(driverId, removedAt)
+            self.timeParked[driverId] = None
+            del self.driverIds[driver.getVehicle()]
+            if self.journal:
+                self.journal.recordRemove(driverId, removedAt)
         
-        currHour = datetime.datetime.now().hour
-        # The line `timeParked = math.ceil()` in the provided code snippet seems to be incomplete and
-        # missing the required arguments for the `math.ceil()` function.
-        timeParked = math.ceil(currHour - self.timeParked[driverId])
-        driver.charge(timeParked * self.rate)
-        del self.timeParked[driverId]
-        return self.garage.removeVehicle(driver.getVehicle())
+        driver.charge(amount)
+        isRemoved = self.garage.removeVehicle(driver.getVehicle())
+        with self.lock:
+            del self.timeParked[driverId]
+        return isRemoved
+    
+    def relocateVehicles(self, index: int, moves: list[tuple[Vehicle, int]]) -> bool:
+        # moves parked vehicles on one floor (e.g. a defrag plan) and journals the new starts;
+        # refused if any of them is still being parked or removed by another gate
+        with self.lock:
+            if any(vehicle not in self.driverIds for vehicle, _ in moves):
+                return False
+            self.garage.relocateVehicles(index, moves)
+            if self.journal:
+                self.journal.recordMoves(index, [(self.driverIds[vehicle], vehicle.getSpotSize(), start)
+                                                 for vehicle, start in moves], self.clock())
+        return True
+    
+    def getMetrics(self) -> dict:
+        return self.metrics.snapshot()
 
 if __name__ == "main":
     parkingGarage = ParkingGarage(3, 2)
@@ -0,0 +1,156 @@
+import math
+
+
+def findFreeRun(blocked: int, length: int, size: int) -> int | None:
+    # lowest start of `length` consecutive zero bits among the low `size` bits of `blocked`
+    free = ~blocked & ((1 << size) - 1)
+    fits = free
+    for shift in range(1, length):
+        fits &= free >> shift
+    if not fits:
+        return None
+    return (fits & -fits).bit_length() - 1
+
+
+def spotMask(start: int, end: int) -> int:
+    return ((1 << (end - start + 1)) - 1) << start
+
+
+class ReservationCalendar:
+    # Time is cut into fixed slots, and a segment tree over a ring of `slots` slots stores spot
+    # bitmasks. A reservation's mask is attached to the O(log slots) nodes that exactly cover
+    # its slots; each node also keeps the OR of everything in its subtree. The spots reserved
+    # at any point of a window are then the OR of O(log slots) node masks. The ring holds the
+    # slots from `base`, the slot of the latest expire(), to `slots` slots later; as `base`
+    # moves forward, reservations still running are re-covered from it so their past slots
+    # can be reused for the future.
+    def __init__(self, spots: int, origin: float, slotSeconds: int = 900, slots: int = 14 * 96):
+        self.spots = spots
+        self.origin = origin
+        self.slotSeconds = slotSeconds
+        self.slots = slots
+        self.base = 0
+        self.treeSize = 1
+        while self.treeSize < slots:
+            self.treeSize *= 2
+        self.cover = {}
+        self.coverMask = [0] * (2 * self.treeSize)
+        self.subtreeMask = [0] * (2 * self.treeSize)
+        self.reservations = {}
+        # reservationId -> (first, last) absolute slots its mask is currently attached to
+        self.covered = {}
+        self.nextId = 1
+
+    def getSlots(self, t1: float, t2: float) -> tuple[int, int]:
+        # absolute slots of [t1, t2), clipped to the present
+        first = max(int((t1 - self.origin) // self.slotSeconds), self.base)
+        last = math.ceil((t2 - self.origin) / self.slotSeconds) - 1
+        if last >= self.base + self.slots:
+            raise ValueError("Reservation window is beyond the calendar horizon")
+        return first, last
+
+    def getHorizon(self) -> float:
+        # end of the last slot the calendar can hold
+        return self.origin + (self.base + self.slots) * self.slotSeconds
+
+    def _ranges(self, first: int, last: int) -> list[tuple[int, int]]:
+        # ring positions of absolute slots [first, last], split where the ring wraps
+        low, high = first % self.slots, last % self.slots
+        if low <= high:
+            return [(low, high)]
+        return [(low, self.slots - 1), (0, high)]
+
+    def _coverNodes(self, first: int, last: int) -> list[int]:
+        nodes = []
+        low = first + self.treeSize
+        high = last + self.treeSize + 1
+        while low < high:
+            if low & 1:
+                nodes.append(low)
+                low += 1
+            if high & 1:
+                high -= 1
+                nodes.append(high)
+            low >>= 1
+            high >>= 1
+        return nodes
+
+    def _pull(self, leaf: int):
+        node = leaf
+        while node:
+            children = 0 if node >= self.treeSize else self.subtreeMask[2 * node] | self.subtreeMask[2 * node + 1]
+            self.subtreeMask[node] = self.coverMask[node] | children
+            node >>= 1
+
+    def _update(self, reservationId: int, mask: int, first: int, last: int, adding: bool):
+        if last < first:
+            return
+        nodes = [node for low, high in self._ranges(first, last) for node in self._coverNodes(low, high)]
+        for node in nodes:
+            entries = self.cover.setdefault(node, {})
+            if adding:
+                entries[reservationId] = mask
+            else:
+                del entries[reservationId]
+                if not entries:
+                    del self.cover[node]
+            combined = 0
+            for entry in entries.values():
+                combined |= entry
+            self.coverMask[node] = combined
+            if node >= self.treeSize:
+                self.subtreeMask[node] = combined
+        for node in nodes:
+            self._pull(node)
+
+    def query(self, t1: float, t2: float) -> int:
+        # spots reserved at any time in [t1, t2)
+        first, last = self.getSlots(t1, min(t2, self.getHorizon()))
+        if last < first:
+            return 0
+        mask = 0
+        for low, high in self._ranges(first, last):
+            for node in self._coverNodes(low, high):
+                mask |= self.subtreeMask[node]
+            for leaf in (low + self.treeSize, high + self.treeSize):
+                node = leaf >> 1
+                while node:
+                    mask |= self.coverMask[node]
+                    node >>= 1
+        return mask
+
+    def findRun(self, length: int, t1: float, t2: float) -> int | None:
+        return findFreeRun(self.query(t1, t2), length, self.spots)
+
+    def add(self, start: int, end: int, t1: float, t2: float) -> int:
+        first, last = self.getSlots(t1, t2)
+        reservationId = self.nextId
+        self.nextId += 1
+        self.reservations[reservationId] = (start, end, t1, t2)
+        self.covered[reservationId] = (first, last)
+        self._update(reservationId, spotMask(start, end), first, last, adding=True)
+        return reservationId
+
+    def remove(self, reservationId: int):
+        start, end, _, _ = self.reservations.pop(reservationId)
+        first, last = self.covered.pop(reservationId)
+        self._update(reservationId, spotMask(start, end), first, last, adding=False)
+
+    def get(self, reservationId: int) -> tuple[int, int, float, float] | None:
+        return self.reservations.get(reservationId)
+
+    def expire(self, now: float):
+        # drops reservations that have ended and moves the ring forward to `now`
+        for reservationId, (_, _, _, t2) in list(self.reservations.items()):
+            if t2 <= now:
+                self.remove(reservationId)
+        base = int((now - self.origin) // self.slotSeconds)
+        if base <= self.base:
+            return
+        self.base = base
+        for reservationId, (first, last) in list(self.covered.items()):
+            if first < base:
+                start, end, _, _ = self.reservations[reservationId]
+                self._update(reservationId, spotMask(start, end), first, last, adding=False)
+                self.covered[reservationId] = (base, last)
+                self._update(reservationId, spotMask(start, end), base, last, adding=True)
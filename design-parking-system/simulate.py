@@ -0,0 +1,107 @@
+import argparse
+import math
+import random
+import time
+
+from parking import ParkingGarage, PlacementPolicy, FirstFit, BestFit, FillFromEnds, SizeSegregatedZones, Vehicle
+
+ARRIVE = 1
+DEPART = 0
+
+
+STAYS = ("exponential", "lognormal", "pareto")
+
+
+def sampleStay(rng: random.Random, stay: str, meanStay: float) -> float:
+    # heavy-tailed choices keep the same mean: most visits are short, a few last many times longer
+    if stay == "lognormal":
+        sigma = 1.0
+        return rng.lognormvariate(math.log(meanStay) - sigma * sigma / 2, sigma)
+    if stay == "pareto":
+        alpha = 1.5
+        return meanStay * (alpha - 1) / alpha * rng.paretovariate(alpha)
+    return rng.expovariate(1 / meanStay)
+
+
+def generateTrace(arrivals: int, arrivalRate: float, meanStay: float, sizeMix: dict[int, float],
+                  seed: int = 0, stay: str = "exponential") -> list[tuple[float, int, int, int]]:
+    # (time, kind, vehicleId, size) events sorted by time; departures sort before arrivals at equal times
+    rng = random.Random(seed)
+    sizes = list(sizeMix)
+    weights = [sizeMix[size] for size in sizes]
+    events = []
+    now = 0.0
+    for vehicleId in range(arrivals):
+        now += rng.expovariate(arrivalRate)
+        size = rng.choices(sizes, weights)[0]
+        events.append((now, ARRIVE, vehicleId, size))
+        events.append((now + sampleStay(rng, stay, meanStay), DEPART, vehicleId, size))
+    events.sort()
+    return events
+
+
+def fragmentation(garage: ParkingGarage) -> float:
+    # share of free spots that are not part of their floor's largest free run
+    free = largest = 0
+    for floor in garage.floors:
+        floorFree = floor.freeRuns.getFreeSpots()
+        if floorFree:
+            free += floorFree
+            largest += floor.freeRuns.largest()
+    return 1 - largest / free if free else 0.0
+
+
+def replay(trace: list, floors: int, spotsPerFloor: int, policy: PlacementPolicy, samples: int = 200) -> dict:
+    garage = ParkingGarage(floors, spotsPerFloor, policy)
+    parked = {}
+    arrivals = rejected = 0
+    rejectedBySize = {}
+    decisionTime = 0.0
+    fragments = []
+    sampleEvery = max(len(trace) // samples, 1)
+
+    for i, (_, kind, vehicleId, size) in enumerate(trace):
+        if kind == ARRIVE:
+            arrivals += 1
+            vehicle = Vehicle(size)
+            start = time.perf_counter()
+            isParked = garage.parkVehicle(vehicle)
+            decisionTime += time.perf_counter() - start
+            if isParked:
+                parked[vehicleId] = vehicle
+            else:
+                rejected += 1
+                rejectedBySize[size] = rejectedBySize.get(size, 0) + 1
+        elif vehicleId in parked:
+            garage.removeVehicle(parked.pop(vehicleId))
+        if i % sampleEvery == 0:
+            fragments.append(fragmentation(garage))
+
+    return {
+        "policy": str(policy),
+        "rejectionRate": rejected / arrivals if arrivals else 0.0,
+        "rejectedBySize": dict(sorted(rejectedBySize.items())),
+        "fragmentation": sum(fragments) / len(fragments) if fragments else 0.0,
+        "decisionMicros": decisionTime / arrivals * 1e6 if arrivals else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a parking trace against each placement policy")
+    parser.add_argument("--arrivals", type=int, default=100_000)
+    parser.add_argument("--floors", type=int, default=10)
+    parser.add_argument("--spots", type=int, default=200)
+    parser.add_argument("--load", type=float, default=0.95, help="offered load as a share of total spots")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sizeMix = {1: 0.7, 2: 0.2, 3: 0.1}
+    meanSize = sum(size * share for size, share in sizeMix.items())
+    meanStay = 100.0
+    arrivalRate = args.load * args.floors * args.spots / (meanSize * meanStay)
+    trace = generateTrace(args.arrivals, arrivalRate, meanStay, sizeMix, args.seed)
+
+    for policy in (FirstFit(), BestFit(), SizeSegregatedZones(), FillFromEnds()):
+        result = replay(trace, args.floors, args.spots, policy)
+        print(f"{result['policy']:>20}: rejected {result['rejectionRate']:.3%} {result['rejectedBySize']} "
+              f"fragmentation {result['fragmentation']:.3f} decision {result['decisionMicros']:.2f}us")
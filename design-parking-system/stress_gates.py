@@ -0,0 +1,72 @@
+import random
+import sys
+import threading
+import time
+
+from parking import ConcurrentParkingGarage, ParkingSystem, Driver, Car, Limo, Semi
+
+FLOORS = 20
+SPOTS_PER_FLOOR = 100
+
+
+def checkConsistency(garage: ConcurrentParkingGarage):
+    for index, floor in enumerate(garage.floors):
+        owners = [None] * len(floor.spots)
+        for vehicle, (start, end) in floor.vehicles.items():
+            for spot in range(start, end + 1):
+                assert owners[spot] is None, f"floor {index} spot {spot} double-booked"
+                owners[spot] = vehicle
+                assert floor.spots[spot] == 1
+            assert garage.getVehicleLocation(vehicle) == (index, start, end)
+        free = sum(1 for owner in owners if owner is None)
+        assert free == floor.freeRuns.getFreeSpots(), f"floor {index} free-run index out of sync"
+    assert len(garage.locations) == sum(len(floor.vehicles) for floor in garage.floors)
+
+
+def gate(system: ParkingSystem, drivers: list[Driver], operations: int, seed: int, barrier: threading.Barrier):
+    rng = random.Random(seed)
+    barrier.wait()
+    for _ in range(operations):
+        driver = rng.choice(drivers)
+        if rng.random() < 0.5:
+            system.parkDriver(driver)
+        else:
+            system.removeDriver(driver)
+
+
+def run(gates: int, operations: int, sharedDrivers: bool) -> float:
+    garage = ConcurrentParkingGarage(FLOORS, SPOTS_PER_FLOOR)
+    system = ParkingSystem(garage, 5)
+    pool = [Driver(random.choice((Car, Car, Car, Limo, Semi))()) for _ in range(FLOORS * SPOTS_PER_FLOOR)]
+    barrier = threading.Barrier(gates + 1)
+    threads = []
+    for i in range(gates):
+        # shared: every gate picks from the same drivers, so gates race for the same driver and spots
+        drivers = pool if sharedDrivers else pool[i::gates]
+        threads.append(threading.Thread(target=gate, args=(system, drivers, operations, i, barrier)))
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    checkConsistency(garage)
+    parkedVehicles = {driver.getVehicle() for driver in pool if system.timeParked.get(driver.getId()) is not None}
+    assert parkedVehicles == set(garage.locations), "parking system and garage disagree"
+    return gates * operations / elapsed
+
+
+if __name__ == "__main__":
+    # switch threads very often so the stress run interleaves gates as much as possible
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    for gates in (2, 4, 8, 16):
+        run(gates, 20_000, sharedDrivers=True)
+    sys.setswitchinterval(interval)
+    print("stress: no double-booked spots or drivers")
+
+    for gates in (1, 2, 4, 8, 16):
+        throughput = run(gates, 50_000, sharedDrivers=False)
+        print(f"gates={gates}: {throughput:,.0f} ops/s")
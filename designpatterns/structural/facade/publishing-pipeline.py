@@ -38,10 +38,26 @@ publisher = RoutinePublisher(song="Eye of the Tiger", color="gold", time=90)
 url = publisher.publish(routine)
 print(url)
 # """
+import asyncio
+import contextlib
+import http.client
+import io
+import json
+import queue
+import random
+import socket
+import sys
+import time
 from abc import ABC, abstractmethod
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List
+from urllib.parse import urlsplit
 from designpatterns.structural.decorator.routineenhancer import BaseRoutine, Routine, LightingDecorator, TimeDecorator, MusicDecorator
-from threading import Lock
+from threading import Condition, Lock, Thread
+
+# workers per pipeline stage in RoutinePublisher.publish_many
+PUBLISH_CONCURRENCY = {"validate": 4, "enhance": 4, "upload": 16, "notify": 4}
 
 class Logger:
    _instance = None
@@ -86,37 +102,286 @@ class RoutineEnhancer:
          routine = TimeDecorator(routine, enhancements["duration"])
       return routine
 
+class UploadError(Exception):
+   pass
+
 class CloudUploader:
-   def __init__(self, connection_string: str):
+   """
+   Uploads routines over a pool of persistent HTTP/1.1 connections. The routine's JSON is
+   encoded in `chunk_size` slices and sent with chunked transfer encoding, so the encoded body
+   is never built up in memory as a whole. Connection failures and 5xx responses are retried with exponential backoff and
+   full jitter; a connection that failed is dropped from the pool rather than reused.
+   """
+   def __init__(self, connection_string: str, pool_size: int = 16, retries: int = 3,
+                backoff: float = 0.05, chunk_size: int = 64 * 1024, timeout: float = 10.0):
       self._connection_string = connection_string
       self._logger = Logger()
+      parts = urlsplit(self._endpoint(connection_string))
+      self._host = parts.hostname
+      self._port = parts.port or 80
+      self._path = parts.path.rstrip("/") + "/routine"
+      self._retries = retries
+      self._backoff = backoff
+      self._chunk_size = chunk_size
+      self._timeout = timeout
+      # idle connections, most recently used first; `_slots` caps how many exist at once
+      self._idle = queue.LifoQueue()
+      self._slots = queue.Queue()
+      for _ in range(pool_size):
+         self._slots.put(None)
+      self._stats_lock = Lock()
+      self._uploads = 0
+      self._requests = 0
+      self._retried = 0
+      self._failures = 0
+      self._connections_opened = 0
+      self._bytes_sent = 0
+      self._started = None
+      self._finished = None
+   
+   @staticmethod
+   def _endpoint(connection_string: str) -> str:
+      # accepts a URL, "host:port[/path]" or the older "host/port[/path]" form
+      if "://" in connection_string:
+         return connection_string
+      host, _, rest = connection_string.partition("/")
+      port, _, path = rest.partition("/")
+      if ":" not in host and port.isdigit():
+         return f"http://{host}:{port}/{path}"
+      return f"http://{connection_string}"
+   
+   def _acquire(self) -> http.client.HTTPConnection:
+      self._slots.get()
+      try:
+         return self._idle.get_nowait()
+      except queue.Empty:
+         with self._stats_lock:
+            self._connections_opened += 1
+         connection = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+         try:
+            connection.connect()
+         except OSError:
+            self._slots.put(None)
+            raise
+         # chunked bodies go out as several small writes; without this Nagle holds them for an ACK
+         connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+         return connection
+   
+   def _release(self, connection: http.client.HTTPConnection, reusable: bool):
+      if reusable:
+         self._idle.put(connection)
+      else:
+         connection.close()
+      self._slots.put(None)
+   
+   def _serialize(self, routine: Routine) -> Iterator[bytes]:
+      # Routine hands back whole strings, but their JSON encoding goes out in slices of at most
+      # `chunk_size` characters; escaping is per character, so slices encode independently
+      yield b'{"routine": "'
+      yield from self._encode_string(str(routine))
+      yield b'", "performance": "'
+      yield from self._encode_string(routine.perform())
+      yield b'"}'
+   
+   def _encode_string(self, value: str) -> Iterator[bytes]:
+      for offset in range(0, len(value), self._chunk_size):
+         yield json.dumps(value[offset:offset + self._chunk_size])[1:-1].encode()
    
-   def upload(self, routine: str) -> str:
-      url = f"{self._connection_string}/routine"
+   def _counted(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+      for chunk in chunks:
+         with self._stats_lock:
+            self._bytes_sent += len(chunk)
+         yield chunk
+   
+   def upload(self, routine: Routine) -> str:
+      url = f"http://{self._host}:{self._port}{self._path}"
       self._logger.log("DEBUG", f"uploading to -> {url}")
-      return url
+      with self._stats_lock:
+         self._started = self._started or time.perf_counter()
+      for attempt in range(self._retries + 1):
+         if attempt:
+            with self._stats_lock:
+               self._retried += 1
+            time.sleep(random.uniform(0, self._backoff * 2 ** (attempt - 1)))
+         try:
+            connection = self._acquire()
+         except OSError as error:
+            self._logger.log("DEBUG", f"upload attempt {attempt + 1} failed: {error!r}")
+            continue
+         reusable = False
+         try:
+            with self._stats_lock:
+               self._requests += 1
+            connection.request("POST", self._path, body=self._counted(self._serialize(routine)),
+                               headers={"Content-Type": "application/json"}, encode_chunked=True)
+            response = connection.getresponse()
+            body = response.read().decode()
+            reusable = not response.will_close
+         except (OSError, http.client.HTTPException) as error:
+            self._logger.log("DEBUG", f"upload attempt {attempt + 1} failed: {error!r}")
+            continue
+         finally:
+            self._release(connection, reusable)
+         if response.status >= 500:
+            self._logger.log("DEBUG", f"upload attempt {attempt + 1} failed: HTTP {response.status}")
+            continue
+         if response.status >= 400:
+            self._record(failed=True)
+            raise UploadError(f"upload rejected with HTTP {response.status}: {body}")
+         self._record(failed=False)
+         return body or url
+      self._record(failed=True)
+      raise UploadError(f"upload to {url} failed after {self._retries + 1} attempts")
+   
+   def _record(self, failed: bool):
+      with self._stats_lock:
+         if failed:
+            self._failures += 1
+         else:
+            self._uploads += 1
+         self._finished = time.perf_counter()
+   
+   def stats(self) -> Dict[str, float]:
+      with self._stats_lock:
+         elapsed = (self._finished - self._started) if self._started and self._finished else 0.0
+         return {
+            "uploads": self._uploads,
+            "failures": self._failures,
+            "retries": self._retried,
+            "connections_opened": self._connections_opened,
+            "connection_reuse_rate": 1 - self._connections_opened / self._requests if self._requests else 0.0,
+            "uploads_per_second": self._uploads / elapsed if elapsed else 0.0,
+            "bytes_per_second": self._bytes_sent / elapsed if elapsed else 0.0,
+         }
+   
+   def close(self):
+      while True:
+         try:
+            self._idle.get_nowait().close()
+         except queue.Empty:
+            return
 
 class CoachNotifier:
-   def __init__(self):
+   def __init__(self, send: Callable[[str, List[str]], None] = None):
       self._logger = Logger()
+      # delivers one message to a recipient; by default it is only logged
+      self._send = send or self._log_message
+      self._stats_lock = Lock()
+      self.sends = 0
+      self.notifications = 0
+      
+   def _log_message(self, recipient: str, urls: List[str]):
+      self._logger.log("DEBUG", f"Notifying Coach {recipient}: {', '.join(urls)}")
+      
+   def _deliver(self, recipient: str, urls: List[str]):
+      self._send(recipient, urls)
+      with self._stats_lock:
+         self.sends += 1
+         self.notifications += len(urls)
+      
+   def notify(self, recipient: str, url: str) -> None:
+      self._deliver(recipient, [url])
       
-   def notify(self, url: str) -> None:
-      self._logger.log("DEBUG", f"Notifying Coach {url}")
+   def close(self):
+      pass
+
+class BatchingCoachNotifier(CoachNotifier):
+   """
+   Buffers notifications per recipient and sends each recipient one digest per window. A
+   window closes `max_delay` seconds after its first notification or as soon as it holds
+   `max_batch` of them, whichever comes first. Digests are sent by a background worker, so
+   notify() never waits on delivery; close() sends whatever is still buffered.
+   """
+   def __init__(self, max_batch: int = 50, max_delay: float = 1.0, send: Callable[[str, List[str]], None] = None):
+      super().__init__(send)
+      self._max_batch = max_batch
+      self._max_delay = max_delay
+      self._buffers = {}
+      self._deadlines = {}
+      self._condition = Condition()
+      self._closed = False
+      self._worker = Thread(target=self._run, daemon=True)
+      self._worker.start()
+      
+   def notify(self, recipient: str, url: str) -> None:
+      with self._condition:
+         if self._closed:
+            raise RuntimeError("Notifier is closed")
+         buffer = self._buffers.setdefault(recipient, [])
+         if not buffer:
+            self._deadlines[recipient] = time.monotonic() + self._max_delay
+         buffer.append(url)
+         if len(buffer) == 1 or len(buffer) == self._max_batch:
+            self._condition.notify()
+      
+   def _take_due(self) -> List[tuple] | None:
+      # waits for at least one closed window; None once closed with nothing left to send
+      with self._condition:
+         while True:
+            now = time.monotonic()
+            batches = []
+            for recipient, deadline in list(self._deadlines.items()):
+               buffer = self._buffers[recipient]
+               if self._closed or deadline <= now:
+                  del self._deadlines[recipient]
+                  batches.append((recipient, self._buffers.pop(recipient)))
+               elif len(buffer) >= self._max_batch:
+                  # full batches go now; the remainder keeps waiting out the current window
+                  full = len(buffer) - len(buffer) % self._max_batch
+                  batches.append((recipient, buffer[:full]))
+                  del buffer[:full]
+                  if not buffer:
+                     del self._deadlines[recipient]
+                     del self._buffers[recipient]
+            if batches:
+               return batches
+            if self._closed:
+               return None
+            timeout = min(self._deadlines.values()) - now if self._deadlines else None
+            self._condition.wait(timeout)
+   
+   def _run(self):
+      while True:
+         batches = self._take_due()
+         if batches is None:
+            return
+         for recipient, urls in batches:
+            for start in range(0, len(urls), self._max_batch):
+               try:
+                  self._deliver(recipient, urls[start:start + self._max_batch])
+               except Exception as error:
+                  self._logger.log("ERROR", f"Digest to {recipient} failed: {error!r}")
+      
+   def close(self):
+      with self._condition:
+         self._closed = True
+         self._condition.notify()
+      self._worker.join()
+   
+class PublishResult:
+   def __init__(self, index: int, routine: Routine):
+      self.index = index
+      self.routine = routine
+      self.url = None
+      self.error = None
+      
+   @property
+   def ok(self) -> bool:
+      return self.error is None
    
 class RoutinePublisher:
-   def __init__(self, song: str, color: str, duration: int):
+   def __init__(self, song: str, color: str, duration: int, uploader: CloudUploader,
+                notifier: CoachNotifier = None, coach: str = "george@georgewardfitness.com"):
       self._song = song
       self._color = color
       self._duration = duration
+      self._coach = coach
       self._validator = RoutineValidator()
       self._enhancer = RoutineEnhancer()
-      self._notifier = CoachNotifier()
-      self._uploader = CloudUploader("10.0.0.8/5000")
-      
-   def publish(self, routine):
-      if not self._validator.validate(routine):
-         raise ValueError("Invalid Routine")
+      self._notifier = notifier or CoachNotifier()
+      self._uploader = uploader
       
+   def _enhancements(self) -> Dict[str, any]:
       enhancements = {}
       if self._song:
          enhancements["song"] = self._song
@@ -124,15 +389,247 @@ class RoutinePublisher:
          enhancements["color"] = self._color
       if self._duration:
          enhancements["duration"] = self._duration
-         
-      routine = self._enhancer.enhance(routine, enhancements)
+      return enhancements
+      
+   def publish(self, routine):
+      if not self._validator.validate(routine):
+         raise ValueError("Invalid Routine")
+      
+      routine = self._enhancer.enhance(routine, self._enhancements())
       upload_url = self._uploader.upload(routine)
-      self._notifier.notify("george@georgewardfitness.com")
+      self._notifier.notify(self._coach, upload_url)
       
       return upload_url
+   
+   async def publish_many(self, routines: Iterable[Routine], concurrency: Dict[str, int] = None) -> AsyncIterator[PublishResult]:
+      """
+      Publishes routines through a pipeline of validate -> enhance -> upload -> notify stages.
+      Each stage has its own pool of workers fed by a bounded queue, so a slow upload holds
+      up one upload worker rather than the validation of the routines behind it. Results are
+      yielded as each routine finishes, in completion order; a routine that fails a stage is
+      yielded with its error and skips the remaining stages.
+      """
+      limits = {**PUBLISH_CONCURRENCY, **(concurrency or {})}
+      loop = asyncio.get_running_loop()
+      # the subsystems are blocking calls, so they run on threads sized to every stage's workers
+      executor = ThreadPoolExecutor(max_workers=sum(limits.values()))
+      enhancements = self._enhancements()
+      
+      def run(func, *args):
+         return loop.run_in_executor(executor, func, *args)
+      
+      async def validate(item: PublishResult):
+         if not await run(self._validator.validate, item.routine):
+            raise ValueError("Invalid Routine")
+         
+      async def enhance(item: PublishResult):
+         item.routine = await run(self._enhancer.enhance, item.routine, enhancements)
+         
+      async def upload(item: PublishResult):
+         item.url = await run(self._uploader.upload, item.routine)
+         
+      async def notify(item: PublishResult):
+         await run(self._notifier.notify, self._coach, item.url)
+      
+      stages = [("validate", validate), ("enhance", enhance), ("upload", upload), ("notify", notify)]
+      queues = [asyncio.Queue(maxsize=2 * limits[name]) for name, _ in stages]
+      remaining = [limits[name] for name, _ in stages]
+      results = asyncio.Queue()
+      
+      async def close_stage(stage: int):
+         # the last worker out passes one stop marker to each worker of the next stage
+         remaining[stage] -= 1
+         if remaining[stage] == 0:
+            if stage + 1 < len(stages):
+               for _ in range(limits[stages[stage + 1][0]]):
+                  await queues[stage + 1].put(None)
+            else:
+               await results.put(None)
+      
+      async def feed():
+         try:
+            for index, routine in enumerate(routines):
+               await queues[0].put(PublishResult(index, routine))
+         except asyncio.CancelledError:
+            # the consumer stopped early and the workers are cancelled too: nothing would drain
+            # a full queue, so no stop markers are sent
+            raise
+         except BaseException:
+            await stop_feeding()
+            raise
+         await stop_feeding()
+      
+      async def stop_feeding():
+         for _ in range(limits[stages[0][0]]):
+            await queues[0].put(None)
+      
+      async def worker(stage: int, work):
+         while True:
+            item = await queues[stage].get()
+            if item is None:
+               break
+            try:
+               await work(item)
+            except Exception as error:
+               item.error = error
+            if item.error or stage + 1 == len(stages):
+               await results.put(item)
+            else:
+               await queues[stage + 1].put(item)
+         await close_stage(stage)
+      
+      tasks = [asyncio.create_task(feed())]
+      for stage, (name, work) in enumerate(stages):
+         tasks.extend(asyncio.create_task(worker(stage, work)) for _ in range(limits[name]))
+      try:
+         while True:
+            item = await results.get()
+            if item is None:
+               break
+            yield item
+      finally:
+         for task in tasks:
+            task.cancel()
+         await asyncio.gather(*tasks, return_exceptions=True)
+         executor.shutdown(wait=False)
+
+class StandInUploadServer:
+   """
+   Local HTTP endpoint that stands in for cloud storage in tests and benchmarks: every POST
+   waits `latency` seconds, then answers with the URL the routine would be stored at. A share
+   `failure_rate` of requests gets a 503 instead, to exercise retries.
+   """
+   def __init__(self, latency: float = 0.05, failure_rate: float = 0.0):
+      latency_seconds = latency
+      failures = failure_rate
+      
+      class Handler(BaseHTTPRequestHandler):
+         protocol_version = "HTTP/1.1"
+         disable_nagle_algorithm = True
+         
+         def read_body(self) -> bytes:
+            if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+               return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            chunks = []
+            while True:
+               size = int(self.rfile.readline().split(b";")[0], 16)
+               chunk = self.rfile.read(size + 2)[:size]
+               if not size:
+                  return b"".join(chunks)
+               chunks.append(chunk)
+         
+         def do_POST(self):
+            self.read_body()
+            time.sleep(latency_seconds)
+            if random.random() < failures:
+               self.send_response(503)
+               self.send_header("Content-Length", "0")
+               self.end_headers()
+               return
+            count = self.server.stored = getattr(self.server, "stored", 0) + 1
+            body = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}{self.path}/{count}".encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+         def log_message(self, format, *args):
+            pass
+      
+      self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+      self._server.daemon_threads = True
+      self._thread = Thread(target=self._server.serve_forever, daemon=True)
+      
+   @property
+   def address(self) -> str:
+      host, port = self._server.server_address
+      return f"{host}:{port}"
+   
+   def __enter__(self):
+      self._thread.start()
+      return self
+   
+   def __exit__(self, *args):
+      self._server.shutdown()
+      self._server.server_close()
+
+def run_benchmark(count: int, latency: float, failure_rate: float = 0.0):
+   with StandInUploadServer(latency, failure_rate) as server, contextlib.redirect_stdout(io.StringIO()):
+      sequential_uploader = CloudUploader(server.address)
+      publisher = RoutinePublisher(song="Eye of the Tiger", color="gold", duration=90, uploader=sequential_uploader)
+      start = time.perf_counter()
+      for _ in range(count):
+         publisher.publish(BaseRoutine())
+      sequential = time.perf_counter() - start
+      
+      uploader = CloudUploader(server.address)
+      publisher = RoutinePublisher(song="Eye of the Tiger", color="gold", duration=90, uploader=uploader)
+      
+      async def publish_all():
+         first = None
+         failed = 0
+         start = time.perf_counter()
+         async for result in publisher.publish_many(BaseRoutine() for _ in range(count)):
+            first = first or time.perf_counter() - start
+            failed += not result.ok
+         return time.perf_counter() - start, first, failed
+      
+      async def close_early():
+         # a consumer that stops after a few results must get control back promptly
+         results = publisher.publish_many(BaseRoutine() for _ in range(count))
+         taken = 0
+         async for _ in results:
+            taken += 1
+            if taken == 3:
+               break
+         start = time.perf_counter()
+         await asyncio.wait_for(results.aclose(), timeout=5)
+         return time.perf_counter() - start
+      
+      pipelined, first, failed = asyncio.run(publish_all())
+      closed = asyncio.run(close_early())
+      sequential_uploader.close()
+      uploader.close()
+   print(f"{count} routines, {latency * 1000:.0f}ms upload latency, {failure_rate:.0%} injected failures")
+   print(f"publish:      {sequential:.2f}s ({count / sequential:.1f}/s)")
+   print(f"publish_many: {pipelined:.2f}s ({count / pipelined:.1f}/s), first result after {first * 1000:.0f}ms, {failed} failed")
+   print(f"publish_many closed after 3 of {count} results in {closed * 1000:.0f}ms")
+   for name, stats in (("publish", sequential_uploader.stats()), ("publish_many", uploader.stats())):
+      print(f"{name} uploader: {stats['uploads_per_second']:.1f} uploads/s, {stats['bytes_per_second'] / 1024:.1f} KiB/s, "
+            f"reuse {stats['connection_reuse_rate']:.1%} ({stats['connections_opened']} connections), "
+            f"{stats['retries']} retries")
+
+def run_notifier_benchmark(count: int, send_latency: float, coaches: int = 3):
+   def send(recipient: str, urls: List[str]):
+      time.sleep(send_latency)
+   
+   print(f"{count} routines for {coaches} coaches, {send_latency * 1000:.0f}ms per message")
+   with StandInUploadServer(latency=0.0) as server, contextlib.redirect_stdout(io.StringIO()) as log:
+      runs = []
+      for notifier in (CoachNotifier(send), BatchingCoachNotifier(max_batch=50, max_delay=0.2, send=send)):
+         uploader = CloudUploader(server.address)
+         publishers = [RoutinePublisher(song="Eye of the Tiger", color="gold", duration=90, uploader=uploader,
+                                        notifier=notifier, coach=f"coach{i}@example.com") for i in range(coaches)]
+         latencies = []
+         for i in range(count):
+            start = time.perf_counter()
+            publishers[i % coaches].publish(BaseRoutine())
+            latencies.append(time.perf_counter() - start)
+         notifier.close()
+         uploader.close()
+         runs.append((type(notifier).__name__, notifier, sorted(latencies)))
+   for name, notifier, latencies in runs:
+      print(f"{name}: {notifier.sends} sends for {notifier.notifications} notifications, "
+            f"publish mean {sum(latencies) / len(latencies) * 1000:.1f}ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
 
 if __name__ == "__main__":
-   routine = BaseRoutine()
-   publisher = RoutinePublisher(song="Eye of the Tiger", color="gold", duration=90)
-   url = publisher.publish(routine)
-   print(url)
\ No newline at end of file
+   with StandInUploadServer(latency=0.0) as server:
+      routine = BaseRoutine()
+      publisher = RoutinePublisher(song="Eye of the Tiger", color="gold", duration=90, uploader=CloudUploader(server.address))
+      url = publisher.publish(routine)
+      print(url)
+   
+   if "--benchmark" in sys.argv:
+      run_benchmark(count=200, latency=0.05)
+      run_benchmark(count=200, latency=0.05, failure_rate=0.1)
+      run_notifier_benchmark(count=300, send_latency=0.02)
\ No newline at end of file